@@ -0,0 +1,66 @@
+"""Compares the cost of re-balancing container limits through the Docker
+Engine API against writing them directly into the cgroup filesystem.
+
+Run as root on a host with Containernet installed:
+
+    sudo python3 benchmarks/cgroup_updates.py --containers 50 --rounds 5
+"""
+import argparse
+import time
+from typing import List
+
+from fogbed import (
+    FogbedExperiment, Container, Resources, Services,
+    CloudResourceModel, setLogLevel
+)
+from fogbed.node.services.local_docker import LocalDocker
+
+
+def update_all(containers: List[Container], rounds: int) -> float:
+    start = time.perf_counter()
+
+    for round in range(rounds):
+        for container in containers:
+            cpu_quota = 10000 + 1000 * (round % 2)
+            container.update_cpu(cpu_quota, Services.cpu_period_in_microseconds())
+            container.update_memory((128 + round % 2) * 1024 * 1024)
+
+    return time.perf_counter() - start
+
+
+def use_service(exp: FogbedExperiment, containers: List[Container], cgroup: bool):
+    for container in containers:
+        docker = exp.net.getDocker(container.name)
+        container.set_docker(LocalDocker(docker, cgroup))
+
+
+if(__name__=='__main__'):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--containers', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    setLogLevel('warning')
+    Services(max_cpu=1.0, max_mem=4096)
+    exp = FogbedExperiment()
+    cloud = exp.add_virtual_instance('cloud', CloudResourceModel(max_cu=1000, max_mu=100000))
+
+    containers = [Container(f'b{i}', resources=Resources.TINY) for i in range(args.containers)]
+    exp.add_dockers(containers, cloud)
+
+    try:
+        exp.start()
+        updates = 2 * args.containers * args.rounds
+
+        use_service(exp, containers, cgroup=False)
+        docker_api = update_all(containers, args.rounds)
+
+        use_service(exp, containers, cgroup=True)
+        cgroupfs = update_all(containers, args.rounds)
+
+        print(f'{updates} updates')
+        print(f'Docker API: {docker_api:.3f}s ({docker_api / updates * 1000:.3f} ms/update)')
+        print(f'cgroupfs:   {cgroupfs:.3f}s ({cgroupfs / updates * 1000:.3f} ms/update)')
+        print(f'speedup:    {docker_api / cgroupfs:.1f}x')
+    finally:
+        exp.stop()
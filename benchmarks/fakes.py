@@ -0,0 +1,200 @@
+"""In-process stand-ins for the Docker, Containernet and clusternet backends,
+so the scalability benchmark runs on a plain Linux box without root.
+
+install_fake_backends() only registers fake mininet/clusternet modules when
+the real packages are not importable; the fake net, worker and service are
+always used by the benchmark, so results do not depend on which is installed.
+"""
+import importlib.util
+import sys
+import types
+from typing import Any, Dict, List, Tuple
+
+FAKE_MODULES: List[str] = []
+
+
+class FakeDockerService:
+    """DockerService that only counts the calls it receives."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def run_command(self, command: str) -> str:
+        self.calls += 1
+        return ''
+
+    def stream_command(self, command: str):
+        self.calls += 1
+        yield ''
+
+    def get_ip(self) -> str:
+        return '10.0.0.1'
+
+    def update_cpu(self, cpu_quota: int, cpu_period: int):
+        self.calls += 1
+
+    def update_memory(self, memory_in_bytes: int):
+        self.calls += 1
+
+    def start(self):
+        self.calls += 1
+
+    def stop(self):
+        self.calls += 1
+
+
+class FakeNode:
+    def __init__(self, name: str, **params: Any) -> None:
+        self.name   = name
+        self.params = params
+        self.pid    = 0
+
+    def cmd(self, command: str) -> str:
+        return ''
+
+    def IP(self) -> str:
+        return self.params.get('ip', '10.0.0.1')
+
+    def configDefault(self, **params: Any):
+        pass
+
+    def updateCpuLimit(self, **params: Any):
+        pass
+
+    def updateMemoryLimit(self, **params: Any):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class FakeNet:
+    """Replaces Fogbed in FogbedExperiment, keeping the nodes in memory."""
+
+    def __init__(self, topo: Any = None, **params: Any) -> None:
+        self.topo = topo
+        self.is_running = False
+        self.nodes: Dict[str, FakeNode] = {}
+        self.links: List[Tuple[str, str]] = []
+
+    def addDocker(self, name: str, **params: Any) -> FakeNode:
+        self.nodes[name] = FakeNode(name, **params)
+        return self.nodes[name]
+
+    def removeDocker(self, name: str):
+        del self.nodes[name]
+
+    def addLink(self, node1: str, node2: str, **params: Any):
+        self.links.append((node1, node2))
+
+    def removeLink(self, node1: str, node2: str, **params: Any):
+        pass
+
+    def getDocker(self, name: str) -> FakeNode:
+        return self.nodes[name]
+
+    def start(self):
+        for name in self.topo.hosts():
+            self.addDocker(name, **self.topo.nodeInfo(name))
+        self.is_running = True
+
+    def stop(self):
+        self.is_running = False
+
+
+class FakeRemoteWorker:
+    """Replaces clusternet's RemoteWorker, recording the requests it would send."""
+
+    def __init__(self, ip: str, port: int = 5000) -> None:
+        self.ip = ip
+        self.url = f'http://{ip}:{port}'
+        self.is_running = False
+        self.requests = 0
+
+    def _request(self, *args: Any, **params: Any):
+        self.requests += 1
+
+    add_controller = add_docker = add_link = add_switch = _request
+    remove_docker = remove_link = config_default = run_command = _request
+
+    def start(self):
+        self._request()
+        self.is_running = True
+
+    def stop(self):
+        self._request()
+        self.is_running = False
+
+
+class FakeRemoteContainer:
+    def __init__(self, name: str, url: str) -> None:
+        self.name = name
+        self.url  = url
+
+
+class FakeTopo:
+    def __init__(self, *args: Any, **params: Any) -> None:
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+        self._switches: Dict[str, Dict[str, Any]] = {}
+        self._links: List[Tuple[str, str, Dict[str, Any]]] = []
+
+    def addHost(self, name: str, **params: Any) -> str:
+        self._hosts[name] = params
+        return name
+
+    def addSwitch(self, name: str, **params: Any) -> str:
+        self._switches[name] = params
+        return name
+
+    def addLink(self, node1: str, node2: str, **params: Any):
+        self._links.append((node1, node2, params))
+
+    def hosts(self, sort: bool = True) -> List[str]:
+        return list(self._hosts)
+
+    def switches(self, sort: bool = True) -> List[str]:
+        return list(self._switches)
+
+    def nodeInfo(self, name: str) -> Dict[str, Any]:
+        return self._hosts.get(name) or self._switches.get(name) or {}
+
+    def setNodeInfo(self, name: str, info: Dict[str, Any]):
+        if(name in self._hosts): self._hosts[name] = info
+        else: self._switches[name] = info
+
+
+def ipAdd(i: int, prefixLen: int = 8, ipBaseNum: int = 0x0a000000) -> str:
+    imax  = 0xffffffff >> prefixLen
+    ipnum = (ipBaseNum & (0xffffffff ^ imax)) + i
+    return '.'.join(str((ipnum >> shift) & 0xff) for shift in (24, 16, 8, 0))
+
+
+def _module(name: str, **attributes: Any):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    FAKE_MODULES.append(name)
+
+
+def install_fake_backends():
+    if(importlib.util.find_spec('mininet') is None):
+        node = type('FakeNodeClass', (FakeNode,), {})
+        _module('mininet')
+        _module('mininet.log', info=lambda *args: None, error=lambda *args: None,
+                debug=lambda *args: None, setLogLevel=lambda level: None)
+        _module('mininet.util', ipAdd=ipAdd, macColonHex=lambda i: f'00:00:00:00:00:{i % 256:02x}')
+        _module('mininet.node', Node=node, Host=node, Docker=node, Switch=node,
+                OVSSwitch=node, Controller=node, RemoteController=node)
+        _module('mininet.link', TCLink=object, Link=object, Intf=object)
+        _module('mininet.net', Containernet=FakeNet, Mininet=FakeNet)
+        _module('mininet.topo', Topo=FakeTopo)
+        _module('mininet.cli', CLI=object)
+
+    if(importlib.util.find_spec('clusternet') is None):
+        _module('clusternet')
+        _module('clusternet.client')
+        _module('clusternet.client.worker', RemoteWorker=FakeRemoteWorker)
+        _module('clusternet.client.container', RemoteContainer=FakeRemoteContainer)
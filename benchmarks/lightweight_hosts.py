@@ -0,0 +1,96 @@
+"""Measures the memory each emulated device costs as a LightweightHost, a
+shell in its own network namespace, and optionally as a Docker container.
+
+Run as root on a host with Containernet installed:
+
+    sudo python3 benchmarks/lightweight_hosts.py --devices 1000
+    sudo python3 benchmarks/lightweight_hosts.py --devices 200 --docker
+
+The drop in MemAvailable includes kernel memory (namespaces, veth pairs and
+switch ports), while PSS only counts the pages of the device processes.
+"""
+import argparse
+import subprocess
+import sys
+import time
+from typing import Dict
+
+from fogbed import (
+    Container, FogbedExperiment, LightweightHost, Resources, Services,
+    EdgeResourceModel, setLogLevel
+)
+
+
+def mem_available() -> int:
+    with open('/proc/meminfo') as file:
+        for line in file:
+            if(line.startswith('MemAvailable:')):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def pss(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as file:
+            for line in file:
+                if(line.startswith('Pss:')):
+                    return int(line.split()[1]) * 1024
+    except FileNotFoundError:
+        pass
+    return 0
+
+
+def measure(devices: int, instances: int, docker: bool) -> Dict[str, float]:
+    setLogLevel('warning')
+    Services(max_cpu=1.0, max_mem=devices * 64)
+    exp = FogbedExperiment()
+
+    datacenters = [
+        exp.add_virtual_instance(f'edge{i}', EdgeResourceModel(max_cu=devices, max_mu=devices * 64))
+        for i in range(instances)
+    ]
+    for i in range(devices):
+        node = Container(f'dv{i}', resources=Resources.TINY) if(docker) \
+            else LightweightHost(f'dv{i}', resources=Resources.TINY)
+        exp.add_docker(node, datacenters[i % instances])
+
+    before = mem_available()
+    try:
+        start = time.perf_counter()
+        exp.start()
+        elapsed = time.perf_counter() - start
+        time.sleep(1)
+
+        used = before - mem_available()
+        pids = [exp.net.getDocker(container.name).pid for container in exp.get_containers()]
+        return {
+            'start_s':          elapsed,
+            'available_kib':    used / devices / 1024,
+            'pss_kib':          sum(pss(pid) for pid in pids) / devices / 1024,
+        }
+    finally:
+        exp.stop()
+
+
+if(__name__=='__main__'):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--devices', type=int, default=100)
+    parser.add_argument('--instances', type=int, default=4)
+    parser.add_argument('--docker', action='store_true', help='also measure Docker containers')
+    parser.add_argument('--kind', choices=['host', 'docker'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if(args.kind):
+        result = measure(args.devices, args.instances, args.kind == 'docker')
+        print(' '.join(str(result[key]) for key in ('start_s', 'available_kib', 'pss_kib')))
+        sys.exit(0)
+
+    # Each measurement runs in its own process, since the registry is global
+    print(f'{"kind":<8} {"devices":>8} {"start (s)":>10} {"MemAvailable/device (KiB)":>26} {"PSS/device (KiB)":>17}')
+    for kind in ['host', 'docker'] if(args.docker) else ['host']:
+        output = subprocess.check_output([
+            sys.executable, __file__, '--kind', kind,
+            '--devices', str(args.devices), '--instances', str(args.instances)
+        ], text=True)
+        elapsed, available, proportional = (float(value) for value in output.split()[-3:])
+        print(f'{kind:<8} {args.devices:>8} {elapsed:>10.2f} {available:>26.0f} {proportional:>17.0f}')
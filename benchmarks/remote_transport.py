@@ -0,0 +1,75 @@
+"""Compares RemoteDocker using one HTTP request per call (clusternet's
+RemoteContainer) against the pooled keep-alive WorkerSession.
+
+Without arguments it runs against a local stand-in worker, which measures
+only the transport. Pass --url to run against a real worker whose network
+already has the containers b0..bN.
+
+    python3 benchmarks/remote_transport.py --containers 20 --calls 500
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from fogbed.node.server import WorkerServer
+from fogbed.node.services.remote_docker import RemoteDocker
+
+
+def measure(services: List[RemoteDocker], calls: int, threads: int):
+    latencies: List[float] = []
+
+    def call(index: int):
+        service = services[index % len(services)]
+        start = time.perf_counter()
+        service.run_command('true')
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(call, range(calls)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'p50': statistics.median(latencies) * 1000,
+        'p99': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'throughput': calls / elapsed
+    }
+
+
+def report(label: str, result):
+    print(f'{label:<22} p50={result["p50"]:7.3f}ms  p99={result["p99"]:7.3f}ms  '
+          f'throughput={result["throughput"]:8.1f} req/s')
+
+
+if(__name__=='__main__'):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', type=str, default='')
+    parser.add_argument('--containers', type=int, default=20)
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    names = [f'b{i}' for i in range(args.containers)]
+    server = None
+    url = args.url
+
+    if(not url):
+        server = WorkerServer()
+        for name in names:
+            server.net.addDocker(name)
+        server.start()
+        url = server.url
+
+    try:
+        for threads in (1, args.threads):
+            per_call = [RemoteDocker(name, url, pooled=False) for name in names]
+            pooled   = [RemoteDocker(name, url) for name in names]
+
+            report(f'per-call  threads={threads}', measure(per_call, args.calls, threads))
+            report(f'pooled    threads={threads}', measure(pooled, args.calls, threads))
+    finally:
+        if(server is not None):
+            server.stop()
@@ -0,0 +1,223 @@
+"""Measures how the emulation bookkeeping scales from 10 to 10,000 containers,
+using the in-process fake backends of fakes.py, so it needs neither root,
+Docker nor Containernet:
+
+    python3 benchmarks/scalability.py --sizes 10 100 1000 10000
+    python3 benchmarks/scalability.py --save baseline.json
+    python3 benchmarks/scalability.py --baseline baseline.json
+
+It runs from a checkout, fogbed does not need to be installed. Timings depend
+on the machine, so no baseline is shipped: save one with --save on the machine
+that runs the comparison, e.g. from the target branch. With --baseline, the run
+fails (exit code 1) when a scenario becomes slower or uses more memory than the
+baseline allows. Adding or removing containers one
+at a time re-balances every container of a Fog/Cloud instance, so those
+scenarios grow quadratically and dominate the run at 10,000 containers.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+# Imports fogbed from the checkout this file belongs to
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import FakeDockerService, FakeNet, FakeRemoteWorker, install_fake_backends
+
+install_fake_backends()
+
+import fogbed.emulation as emulation
+import fogbed.experiment.local as local
+from fogbed import (
+    Container, FogbedExperiment, Resources, Services, VirtualInstance, Worker,
+    CloudResourceModel, EdgeResourceModel, FogResourceModel
+)
+from fogbed.node.services.session import get_session
+
+# FogbedExperiment builds its network on the fake net instead of Containernet
+local.Fogbed = FakeNet
+
+INSTANCES = 10
+MODELS = {'edge': EdgeResourceModel, 'fog': FogResourceModel, 'cloud': CloudResourceModel}
+
+# A scenario prepares its state untimed and returns the operation to measure
+Scenario = Callable[[int], Callable[[], Any]]
+
+
+def reset():
+    emulation.nodes.clear()
+    emulation.containers_by_name.clear()
+    emulation.containers_by_ip.clear()
+    emulation.instances_by_container.clear()
+    Services._invalidate_totals()
+    Services(max_cpu=1.0, max_mem=4096)
+    Container.IP_COUNTER = 0
+
+
+def new_experiment(model: str, size: int) -> Tuple[FogbedExperiment, List[VirtualInstance]]:
+    exp = FogbedExperiment()
+    instances = [
+        exp.add_virtual_instance(f'dc{index}', MODELS[model](max_cu=size, max_mu=size * 32))
+        for index in range(INSTANCES)
+    ]
+    return exp, instances
+
+
+def new_containers(size: int) -> List[Container]:
+    containers = [Container(f'd{index}', resources=Resources.TINY) for index in range(size)]
+    for container in containers:
+        container.set_docker(FakeDockerService())
+    return containers
+
+
+def add_virtual_instance(size: int):
+    exp = FogbedExperiment()
+    return lambda: [exp.add_virtual_instance(f'dc{index}') for index in range(size)]
+
+
+def add_docker(model: str) -> Scenario:
+    def scenario(size: int):
+        exp, instances = new_experiment(model, size)
+        containers = new_containers(size)
+        return lambda: [exp.add_docker(container, instances[index % INSTANCES])
+                        for index, container in enumerate(containers)]
+    return scenario
+
+
+def add_dockers(size: int):
+    exp, instances = new_experiment('cloud', size)
+    containers = new_containers(size)
+    groups = [containers[index::INSTANCES] for index in range(INSTANCES)]
+    return lambda: [exp.add_dockers(group, instance) for group, instance in zip(groups, instances)]
+
+
+def remove_docker(size: int):
+    exp, instances = new_experiment('cloud', size)
+    containers = new_containers(size)
+    for index, container in enumerate(containers):
+        exp.add_docker(container, instances[index % INSTANCES])
+    return lambda: [exp.remove_docker(container.name) for container in containers]
+
+
+def start(size: int):
+    exp, instances = new_experiment('cloud', size)
+    for index, container in enumerate(new_containers(size)):
+        exp.add_docker(container, instances[index % INSTANCES])
+    return exp.start
+
+
+def new_worker(size: int) -> Worker:
+    worker = Worker('10.10.0.1')
+    worker.net = FakeRemoteWorker(worker.ip)
+    # The pooled session is created once per worker, outside the measurement
+    get_session(worker.net.url)
+    for index in range(INSTANCES):
+        instance = VirtualInstance(f'wdc{index}')
+        Services.add_virtual_instance(instance)
+        worker.add(instance, reachable=True)
+
+    instances = list(worker.datacenters.values())
+    for index, container in enumerate(new_containers(size)):
+        instances[index % INSTANCES].create_container(container)
+    return worker
+
+
+def create_topology(size: int):
+    return new_worker(size)._create_topology
+
+
+def describe_topology(size: int):
+    worker = new_worker(size)
+    return lambda: worker._describe_topology('127.0.0.1', 6633).to_dict
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    'add_virtual_instance':     add_virtual_instance,
+    'add_docker[edge]':         add_docker('edge'),
+    'add_docker[fog]':          add_docker('fog'),
+    'add_docker[cloud]':        add_docker('cloud'),
+    'add_dockers[cloud]':       add_dockers,
+    'remove_docker[cloud]':     remove_docker,
+    'experiment_start':         start,
+    'worker_create_topology':   create_topology,
+    'worker_describe_topology': describe_topology,
+}
+
+
+def measure_time(scenario: Scenario, size: int, repeats: int) -> float:
+    timings: List[float] = []
+    for _ in range(repeats):
+        reset()
+        operation = scenario(size)
+        start = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def measure_memory(scenario: Scenario, size: int) -> int:
+    reset()
+    operation = scenario(size)
+    tracemalloc.start()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, Dict[str, float]]],
+    baseline: Dict[str, Dict[str, Dict[str, float]]],
+    time_tolerance: float,
+    memory_tolerance: float
+) -> List[str]:
+    regressions: List[str] = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            expected = baseline.get(name, {}).get(size)
+            if(expected is None): continue
+
+            # The absolute slack keeps sub-millisecond scenarios from flapping
+            if(result['time_s'] > expected['time_s'] * (1 + time_tolerance) + 0.002):
+                regressions.append(f'{name}[{size}]: {result["time_s"]*1e3:.1f}ms, baseline {expected["time_s"]*1e3:.1f}ms')
+            if(result['peak_bytes'] > expected['peak_bytes'] * (1 + memory_tolerance) + 64 * 1024):
+                regressions.append(f'{name}[{size}]: {result["peak_bytes"]/1024:.0f}KiB, baseline {expected["peak_bytes"]/1024:.0f}KiB')
+    return regressions
+
+
+if(__name__=='__main__'):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--save', help='write the results as a baseline JSON file')
+    parser.add_argument('--baseline', help='fail when slower or bigger than this baseline')
+    parser.add_argument('--time-tolerance', type=float, default=0.5)
+    parser.add_argument('--memory-tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+    if(args.baseline and not os.path.exists(args.baseline)):
+        sys.exit(f'Baseline {args.baseline} not found, create it with --save {args.baseline}')
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    print(f'{"scenario":<26} {"containers":>10} {"time (ms)":>11} {"per item (us)":>14} {"peak (KiB)":>11}')
+
+    for name in args.scenarios:
+        for size in args.sizes:
+            elapsed = measure_time(SCENARIOS[name], size, args.repeats)
+            peak = measure_memory(SCENARIOS[name], size)
+            results.setdefault(name, {})[str(size)] = {'time_s': elapsed, 'peak_bytes': peak}
+            print(f'{name:<26} {size:>10} {elapsed*1e3:>11.2f} {elapsed/size*1e6:>14.2f} {peak/1024:>11.0f}')
+
+    if(args.save):
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if(args.baseline):
+        with open(args.baseline) as file:
+            regressions = find_regressions(results, json.load(file), args.time_tolerance, args.memory_tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        sys.exit(1 if(regressions) else 0)
@@ -0,0 +1,69 @@
+"""Measures FogbedExperiment.start() with the serial topology build and with
+a concurrent build on a bounded thread pool.
+
+Run as root on a host with Containernet installed:
+
+    sudo python3 benchmarks/startup.py --containers 200 --compare 1,8,16
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+from fogbed import (
+    FogbedExperiment, Container, Resources, Services,
+    FogResourceModel, setLogLevel
+)
+
+
+def measure(containers: int, instances: int, max_workers: int) -> float:
+    setLogLevel('warning')
+    Services(max_cpu=1.0, max_mem=8192)
+    exp = FogbedExperiment(max_workers=max_workers)
+
+    datacenters = [
+        exp.add_virtual_instance(f'fog{i}', FogResourceModel(max_cu=1000, max_mu=100000))
+        for i in range(instances)
+    ]
+    for i in range(containers):
+        datacenter = datacenters[i % instances]
+        exp.add_docker(Container(f'st{i}', resources=Resources.TINY), datacenter)
+
+    for first, second in zip(datacenters, datacenters[1:]):
+        exp.add_link(first, second)
+
+    try:
+        start = time.perf_counter()
+        exp.start()
+        return time.perf_counter() - start
+    finally:
+        exp.stop()
+
+
+if(__name__=='__main__'):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--containers', type=int, default=100)
+    parser.add_argument('--instances', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--compare', type=str, default='', help='comma separated worker counts')
+    args = parser.parse_args()
+
+    if(not args.compare):
+        elapsed = measure(args.containers, args.instances, args.workers)
+        print(f'{elapsed:.2f}')
+        sys.exit(0)
+
+    # Each measurement runs in its own process, since the registry is global
+    results = {}
+    for workers in [int(value) for value in args.compare.split(',')]:
+        output = subprocess.check_output([
+            sys.executable, __file__,
+            '--containers', str(args.containers),
+            '--instances', str(args.instances),
+            '--workers', str(workers)
+        ], text=True)
+        results[workers] = float(output.strip().splitlines()[-1])
+
+    baseline = results[min(results)]
+    for workers, elapsed in results.items():
+        print(f'max_workers={workers:<4} start={elapsed:8.2f}s  speedup={baseline / elapsed:5.2f}x')
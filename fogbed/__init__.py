@@ -1,9 +1,12 @@
 from fogbed.emulation import Services
 from fogbed.experiment.local import FogbedExperiment
 from fogbed.experiment.distributed import FogbedDistributedExperiment
-from fogbed.node import Container, VirtualInstance, Worker
+from fogbed.experiment.plan import DryRunExperiment
+from fogbed.node import Container, LightweightHost, VirtualInstance, Worker
 from fogbed.resources import Resources
 from fogbed.resources.flavors import HardwareResources
 from fogbed.resources.models import CloudResourceModel, EdgeResourceModel, FogResourceModel
+from fogbed.simulator import DeviceSimulator, VirtualDevice
+from fogbed.tracing import tracer
 
 from mininet.log import setLogLevel
\ No newline at end of file
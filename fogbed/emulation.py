@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from fogbed.exceptions import ContainerNotFound
 from fogbed.node.container import Container
 from fogbed.node.instance import VirtualInstance
@@ -9,6 +9,15 @@ MAX_MEM = 512
 
 nodes: Dict[str, VirtualInstance] = {}
 
+# Indexes kept in sync with the containers of every VirtualInstance
+containers_by_name: Dict[str, Container] = {}
+containers_by_ip: Dict[str, Container] = {}
+instances_by_container: Dict[str, VirtualInstance] = {}
+
+# Totals over all VirtualInstances, recomputed only after an instance is added or removed
+ALL_COMPUTE_UNITS: Optional[float] = None
+ALL_MEMORY_UNITS: Optional[int] = None
+
 class Services:
     def __init__(self, max_cpu: float, max_mem: int) -> None:
         global MAX_CPU, MAX_MEM
@@ -18,11 +27,44 @@ class Services:
     @staticmethod
     def add_virtual_instance(datacenter: VirtualInstance):
         nodes[datacenter.label] = datacenter
+        Services._invalidate_totals()
+
+        for container in datacenter:
+            Services.add_container(container, datacenter)
+
+    @staticmethod
+    def remove_virtual_instance(name: str):
+        datacenter = nodes.pop(name)
+        Services._invalidate_totals()
+
+        for container in datacenter:
+            Services.remove_container(container.name)
     
     @staticmethod
     def virtual_instances() -> Dict[str, VirtualInstance]:
         return nodes
 
+    @staticmethod
+    def add_container(container: Container, datacenter: VirtualInstance):
+        containers_by_name[container.name] = container
+        instances_by_container[container.name] = datacenter
+        for ip in container.addresses:
+            containers_by_ip[ip] = container
+
+    @staticmethod
+    def add_address(ip: str, container: Container):
+        containers_by_ip[ip] = container
+
+    @staticmethod
+    def remove_container(name: str):
+        container = containers_by_name.pop(name, None)
+        instances_by_container.pop(name, None)
+
+        if(container is None): return
+        for ip in container.addresses:
+            if(containers_by_ip.get(ip) is container):
+                containers_by_ip.pop(ip)
+
     @staticmethod
     def cpu_period_in_microseconds() -> int:
         return CPU_PERIOD
@@ -37,11 +79,23 @@ class Services:
 
     @staticmethod
     def get_all_compute_units() -> float:
-        return sum([dc.compute_units for dc in nodes.values()])
+        global ALL_COMPUTE_UNITS
+        if(ALL_COMPUTE_UNITS is None):
+            ALL_COMPUTE_UNITS = sum([dc.compute_units for dc in nodes.values()])
+        return ALL_COMPUTE_UNITS
 
     @staticmethod
     def get_all_memory_units() -> int:
-        return sum([dc.memory_units for dc in nodes.values()])
+        global ALL_MEMORY_UNITS
+        if(ALL_MEMORY_UNITS is None):
+            ALL_MEMORY_UNITS = sum([dc.memory_units for dc in nodes.values()])
+        return ALL_MEMORY_UNITS
+
+    @staticmethod
+    def _invalidate_totals():
+        global ALL_COMPUTE_UNITS, ALL_MEMORY_UNITS
+        ALL_COMPUTE_UNITS = None
+        ALL_MEMORY_UNITS = None
     
     @staticmethod
     def get_all_containers() -> List[Container]:
@@ -53,22 +107,17 @@ class Services:
     
     @staticmethod
     def get_virtual_instance_by_container(name: str) -> VirtualInstance:
-        for datacenter in nodes.values():
-            if(name in datacenter.containers):
-                return datacenter
-        raise ContainerNotFound(f'Container {name} not found.')
+        datacenter = instances_by_container.get(name)
+
+        if(datacenter is None):
+            raise ContainerNotFound(f'Container {name} not found.')
+        return datacenter
     
     @staticmethod
     def get_container_by_ip(ip: str) -> 'Container | None':
-        for container in Services.get_all_containers():
-            if(container.ip == ip):
-                return container
-        return None
+        return containers_by_ip.get(ip)
     
     @staticmethod
     def get_container_by_name(name: str) -> 'Container | None':
-        for container in Services.get_all_containers():
-            if(container.name == name):
-                return container
-        return None
+        return containers_by_name.get(name)
     
\ No newline at end of file
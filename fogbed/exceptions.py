@@ -1,12 +1,40 @@
+from typing import Dict, List
+
+
 class ContainerAlreadyExists(Exception):
     pass
 
 class ContainerNotFound(Exception):
     pass
 
+class CommandFailed(Exception):
+    def __init__(self, errors: Dict[str, Exception], results: Dict[str, str]) -> None:
+        self.errors  = errors
+        self.results = results
+        details = '; '.join(f'{name}: {error}' for name, error in errors.items())
+        super().__init__(f'Command failed on {len(errors)} container(s): {details}')
+
+class ContainerNotReady(Exception):
+    def __init__(self, names: List[str], timeout: float) -> None:
+        self.names = names
+        super().__init__(f'Containers not ready after {timeout}s: {", ".join(names)}')
+
+class LinkNotFound(Exception):
+    def __init__(self, node1: str, node2: str) -> None:
+        super().__init__(f'Link between {node1} and {node2} not found.')
+
+class LinkUpdateFailed(Exception):
+    pass
+
 class NotEnoughResourcesAvailable(Exception):
     pass
 
+class PlacementFailed(Exception):
+    def __init__(self, names: List[str]) -> None:
+        self.names = names
+        listed = ', '.join(names[:10]) + (f' and {len(names) - 10} more' if(len(names) > 10) else '')
+        super().__init__(f'No VirtualInstance can host: {listed}')
+
 class ResourceModelNotFound(Exception):
     pass
 
@@ -16,4 +44,9 @@ class VirtualInstanceAlreadyExists(Exception):
 class VirtualInstanceNotFound(Exception):
     def __init__(self, name: str) -> None:
         super().__init__(f'Datacenter {name} not found.')
-    
\ No newline at end of file
+
+class WorkerError(Exception):
+    def __init__(self, errors: Dict[str, Exception]) -> None:
+        self.errors = errors
+        details = '; '.join(f'{ip}: {error}' for ip, error in errors.items())
+        super().__init__(f'Failed on {len(errors)} worker(s): {details}')
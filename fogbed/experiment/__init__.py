@@ -1,10 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Union
 
+from fogbed.exceptions import CommandFailed
 from fogbed.node.container import Container
 from fogbed.node.instance import VirtualInstance
+from fogbed.node.probes import Backoff, wait_ready
+from fogbed.resources.placement import Placement, Tier
 from fogbed.resources.protocols import ResourceModel
 
+if TYPE_CHECKING:
+    from fogbed.experiment.timeline import Timeline
+
 
 class Experiment(ABC):
     @abstractmethod
@@ -15,6 +21,61 @@ class Experiment(ABC):
     def add_docker(self, container: Container, datacenter: VirtualInstance):
         pass
 
+    def add_dockers(self, containers: List[Container], datacenter: VirtualInstance):
+        with datacenter.batch():
+            for container in containers:
+                self.add_docker(container, datacenter)
+
+    def place_dockers(self,
+        containers: Iterable[Container],
+        instances: Optional[Iterable[VirtualInstance]] = None,
+        strategy: str = 'best_fit',
+        tiers: Optional[Dict[str, Tier]] = None,
+        affinity: Iterable[Iterable[str]] = (),
+        anti_affinity: Iterable[Iterable[str]] = ()
+    ) -> Dict[str, VirtualInstance]:
+        containers = list(containers)
+        instances = self.get_virtual_instances() if(instances is None) else instances
+        assignment = Placement(instances, strategy).place(containers, tiers, affinity, anti_affinity)
+
+        groups: Dict[str, List[Container]] = {}
+        for container in containers:
+            groups.setdefault(assignment[container.name].label, []).append(container)
+        for group in groups.values():
+            self.add_dockers(group, assignment[group[0].name])
+        return assignment
+
+    def cmd(self, 
+        command: str, 
+        targets: Union[VirtualInstance, Iterable[Container], None] = None
+    ) -> Dict[str, str]:
+        containers = self.get_containers() if(targets is None) else list(targets)
+        futures = {container.name: container.cmd_async(command) for container in containers}
+        results: Dict[str, str] = {}
+        errors: Dict[str, Exception] = {}
+
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as ex:
+                errors[name] = ex
+
+        if(errors):
+            raise CommandFailed(errors, results)
+        return results
+
+    def wait_ready(self, 
+        containers: Optional[Iterable[Container]] = None, 
+        timeout: float = 60.0,
+        backoff: Optional[Backoff] = None
+    ) -> Dict[str, float]:
+        containers = self.get_containers() if(containers is None) else containers
+        return wait_ready(containers, timeout, backoff)
+
+    def timeline(self, max_workers: int = 16) -> 'Timeline':
+        from fogbed.experiment.timeline import Timeline
+        return Timeline(self, max_workers)
+
     @abstractmethod
     def get_docker(self, name: str) -> Container:
         pass
@@ -1,32 +1,43 @@
-from typing import Any, Dict, List, Optional
+import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from fogbed.emulation import Services
-from fogbed.exceptions import ContainerNotFound, NotEnoughResourcesAvailable
+from fogbed.exceptions import ContainerNotFound, NotEnoughResourcesAvailable, WorkerError
 from fogbed.experiment import Experiment
 from fogbed.experiment.helpers import (
     verify_if_container_ip_exists, 
     verify_if_container_name_exists,
     verify_if_datacenter_exists
 )
+from fogbed.experiment.link import LinkUpdate
 from fogbed.node.instance import VirtualInstance
 from fogbed.node.container import Container
+from fogbed.node.host import LightweightHost
 from fogbed.node.services.remote_docker import RemoteDocker
-from fogbed.node.worker import Worker
+from fogbed.node.worker import Worker, get_mtu_command, get_tunnel_mtu
 from fogbed.resources.protocols import ResourceModel
+from fogbed.tracing import tracer
 
 from mininet.log import info
 
 class FogbedDistributedExperiment(Experiment):
-    def __init__(self, controller_ip: str, controller_port: int) -> None:
+    def __init__(self, controller_ip: str, controller_port: int, max_workers: Optional[int] = None) -> None:
         self.controller_ip   = controller_ip
         self.controller_port = controller_port
+        self.max_workers     = max_workers
         self.workers: Dict[str, Worker] = {}
+        self.tunnel_path: Optional[Dict[str, Any]] = None
         self.is_running = False
 
 
     def add_docker(self, container: Container, datacenter: VirtualInstance):
+        if(isinstance(container, LightweightHost)):
+            raise Exception(f'{container.name}: lightweight hosts are only supported by FogbedExperiment')
         verify_if_container_name_exists(container.name)
-        verify_if_container_ip_exists(container.ip)
+        for ip in container.addresses:
+            verify_if_container_ip_exists(ip)
 
         try:
             datacenter.create_container(container)
@@ -38,22 +49,64 @@ class FogbedDistributedExperiment(Experiment):
                 worker.net.config_default(container.name)
                 service = RemoteDocker(container.name, worker.net.url)
                 container.set_docker(service)
+                if(self.tunnel_path is not None):
+                    container.cmd(get_mtu_command(self.tunnel_path['mtu']))
 
         except NotEnoughResourcesAvailable:
             info(f'{container.name}: Allocation of container was blocked by resource model.\n\n')
 
               
 
-    def add_tunnel(self, worker1: Worker, worker2: Worker, **params: Any):
-        worker1.add_tunnel(worker2.ip)
-        worker2.add_tunnel(worker1.ip)
-        
-
-    def add_worker(self, ip: str) -> Worker:
+    def add_tunnel(self, worker1: Worker, worker2: Worker, underlay_mtu: int = 1500, **params: Any):
+        worker1.add_tunnel(worker2.ip, **params)
+        worker2.add_tunnel(worker1.ip, **params)
+        self._set_tunnel_mtu(get_tunnel_mtu(params.get('kind', 'gre'), params.get('key'), underlay_mtu))
+
+    def _set_tunnel_mtu(self, mtu: int, offload: Optional[Dict[str, bool]] = None):
+        # Containers of every worker get the MTU of the tunnel with most overhead
+        if(self.tunnel_path is None):
+            self.tunnel_path = {'mtu': mtu, 'offload': offload}
+        else:
+            self.tunnel_path['mtu'] = min(self.tunnel_path['mtu'], mtu)
+            self.tunnel_path['offload'] = offload or self.tunnel_path['offload']
+
+
+    def add_tunnel_mesh(self,
+        topology: str = 'full',
+        hub: Optional[Worker] = None,
+        kind: str = 'gre',
+        key: Optional[int] = None,
+        underlay_mtu: int = 1500,
+        offload: Optional[Dict[str, bool]] = None
+    ) -> List[Tuple[str, str]]:
+        workers = list(self.workers.values())
+        if(topology == 'full'):
+            pairs = list(combinations(workers, 2))
+        elif(topology == 'hub'):
+            hub = workers[0] if(hub is None) else hub
+            pairs = [(hub, worker) for worker in workers if(worker is not hub)]
+        else:
+            raise Exception(f'Unknown tunnel topology {topology}, expected full or hub')
+
+        created: List[Tuple[str, str]] = []
+        for worker1, worker2 in pairs:
+            if(worker2.ip in worker1.tunnels): continue
+            self.add_tunnel(worker1, worker2, underlay_mtu, kind=kind, key=key)
+            created.append((worker1.ip, worker2.ip))
+
+        if(topology == 'full' and len(workers) > 2):
+            for worker in workers:
+                worker.loop_protection = True
+
+        self._set_tunnel_mtu(get_tunnel_mtu(kind, key, underlay_mtu), offload)
+        return created
+
+
+    def add_worker(self, ip: str, bulk: bool = False, port: int = 5000) -> Worker:
         if(ip in self.workers):
             raise Exception(f'Already exist a worker with ip={ip}')
 
-        worker = Worker(ip=ip)
+        worker = Worker(ip=ip, bulk=bulk, port=port)
         self.workers[worker.ip] = worker
         return worker
     
@@ -80,6 +133,27 @@ class FogbedDistributedExperiment(Experiment):
     def get_virtual_instances(self) -> List[VirtualInstance]:
         return list(Services.virtual_instances().values())
 
+    def update_link(self, node1: VirtualInstance, node2: VirtualInstance, **params: Any):
+        self.update_links([(node1, node2, params)])
+
+    def update_links(self, updates: Iterable[LinkUpdate]):
+        """Changes the shaping of links inside workers, with one tc process per
+        worker, all of them at once; tunnels between workers are not shaped."""
+        groups: Dict[str, List[LinkUpdate]] = {}
+        for node1, node2, params in updates:
+            for node in (node1, node2):
+                if(not node.get_ip() in self.workers):
+                    raise Exception(f'{node.label} is not assigned to a worker')
+            if(node1.get_ip() != node2.get_ip()):
+                raise Exception(f'{node1.label} and {node2.label} are linked by a tunnel between workers')
+            groups.setdefault(node1.get_ip(), []).append((node1, node2, params))
+
+        workers = [self.workers[ip] for ip in groups]
+        _, errors = self._run_on_workers(lambda worker: worker.update_links(groups[worker.ip]), workers)
+        if(errors):
+            raise WorkerError(errors)
+
+
     def _get_worker_by_datacenter(self, datacenter: VirtualInstance) -> Worker:
         return self.workers[datacenter.get_ip()]
 
@@ -93,13 +167,86 @@ class FogbedDistributedExperiment(Experiment):
             worker.net.remove_docker(name)
 
 
+    def _run_on_workers(self, 
+        action: Callable[[Worker], Any], 
+        workers: List[Worker]
+    ) -> Tuple[List[Worker], Dict[str, Exception]]:
+        succeeded: List[Worker] = []
+        errors: Dict[str, Exception] = {}
+        if(not workers): return succeeded, errors
+
+        with ThreadPoolExecutor(self.max_workers or len(workers)) as pool:
+            futures = {worker.ip: pool.submit(action, worker) for worker in workers}
+
+        for worker in workers:
+            error = futures[worker.ip].exception()
+            if(error is None): succeeded.append(worker)
+            elif(isinstance(error, Exception)): errors[worker.ip] = error
+            else: raise error
+        return succeeded, errors
+
+
     def start(self):
-        for worker in self.workers.values():
-            worker.start(self.controller_ip, self.controller_port)
+        workers = list(self.workers.values())
+        tunnel_path = self.tunnel_path
+        with tracer.span('experiment_start', workers=len(workers)):
+            _, errors = self._run_on_workers(
+                lambda worker: worker.start(self.controller_ip, self.controller_port), workers)
+
+            if(not errors and tunnel_path is not None):
+                with tracer.span('configure_tunnel_path', mtu=tunnel_path['mtu']):
+                    _, errors = self._run_on_workers(
+                        lambda worker: worker.configure_tunnel_path(**tunnel_path), workers)
+
+            if(errors):
+                # A worker may fail after its network started, e.g. creating the tunnels
+                running = [worker for worker in workers if(worker.is_running)]
+                info(f'*** Stopping {len(running)} started worker(s)\n')
+                self._run_on_workers(lambda worker: worker.stop(), running)
+                raise WorkerError(errors)
         self.is_running = True
 
-    def stop(self):
+
+    def check_tunnels(self, duration: int = 3) -> Dict[Tuple[str, str], Optional[float]]:
+        """Measures the throughput in Mbit/s of each tunnel with iperf3, between
+        containers of reachable instances; None when a pair could not be measured."""
+        results: Dict[Tuple[str, str], Optional[float]] = {}
+        checked = set()
+
         for worker in self.workers.values():
-            if(worker.is_running):
-                worker.stop()
+            for ip in worker.tunnels:
+                pair = tuple(sorted((worker.ip, ip)))
+                if(pair in checked): continue
+                checked.add(pair)
+                results[pair] = self._measure_throughput(self.workers[pair[0]], self.workers[pair[1]], duration)  # type: ignore
+        return results
+
+    def _measure_throughput(self, worker1: Worker, worker2: Worker, duration: int) -> Optional[float]:
+        client = self._get_reachable_container(worker1)
+        server = self._get_reachable_container(worker2)
+        if(client is None or server is None):
+            return None
+
+        server.cmd('iperf3 -s -1 -D; sleep 0.2')
+        output = client.cmd(f'iperf3 -c {server.ip} -t {duration} -J')
+        try:
+            return json.loads(output[output.index('{'):])['end']['sum_received']['bits_per_second'] / 1e6
+        except (ValueError, KeyError):
+            info(f'*** Could not measure {worker1.ip} <-> {worker2.ip}: {output.strip()[:200]}\n')
+            return None
+
+    def _get_reachable_container(self, worker: Worker) -> Optional[Container]:
+        for datacenter in worker.datacenters.values():
+            if(datacenter.is_reachable):
+                for container in datacenter:
+                    return container
+        return None
+
+    def stop(self):
+        workers = [worker for worker in self.workers.values() if(worker.is_running)]
+        with tracer.span('experiment_stop', workers=len(workers)):
+            _, errors = self._run_on_workers(lambda worker: worker.stop(), workers)
         self.is_running = False
+
+        if(errors):
+            raise WorkerError(errors)
@@ -1,4 +1,13 @@
-from typing import Any, Dict
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from fogbed.node.instance import VirtualInstance
+
+# TCLink parameters that tc can change on a running link
+SHAPING_PARAMS = ('bw', 'delay', 'jitter', 'loss', 'max_queue_size')
+BATCH_MARKER = 'tc-exit='
+
+LinkUpdate = Tuple[VirtualInstance, VirtualInstance, Dict[str, Any]]
 
 
 class Link:
@@ -12,3 +21,78 @@ class Link:
         self.params['node1'] = self.node1
         self.params['node2'] = self.node2
         return self.params
+
+
+def get_shaping(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: params[key] for key in SHAPING_PARAMS if(params.get(key) is not None)}
+
+
+def merge_shaping(current: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    """Applies changes to the shaping of a link; a value of None removes it."""
+    unknown = [key for key in changes if(not key in SHAPING_PARAMS)]
+    if(unknown):
+        raise Exception(f'Cannot change {", ".join(unknown)} of a link, expected {SHAPING_PARAMS}')
+
+    merged = dict(current)
+    for key, value in changes.items():
+        if(value is None): merged.pop(key, None)
+        else: merged[key] = value
+    return merged
+
+
+def set_shaping(params: Dict[str, Any], shaping: Dict[str, Any]):
+    for key in SHAPING_PARAMS:
+        params.pop(key, None)
+    params.update(shaping)
+
+
+def get_netem_args(shaping: Dict[str, Any]) -> str:
+    # Same options TCIntf gives netem when it creates the link
+    args: List[str] = []
+    if(shaping.get('delay')):
+        args.append(f'delay {shaping["delay"]}')
+        if(shaping.get('jitter')): args.append(str(shaping['jitter']))
+    if(shaping.get('loss')):
+        args.append(f'loss {float(shaping["loss"]):.5f}')
+    if(shaping.get('max_queue_size') is not None):
+        args.append(f'limit {int(shaping["max_queue_size"])}')
+    return ' '.join(args)
+
+
+def get_shaping_commands(interface: str, current: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """tc batch lines that take an interface shaped by TCLink from current to
+    new. Rates and netem options change in place; only adding or removing bw
+    or netem rebuilds the qdiscs, since their tree is different."""
+    bw, netem = new.get('bw'), get_netem_args(new)
+    current_bw, current_netem = current.get('bw'), get_netem_args(current)
+    htb = f'htb rate {float(bw):f}Mbit burst 15k' if(bw is not None) else ''
+    parent = 'root' if(bw is None) else 'parent 5:1'
+
+    if((current_bw is None) == (bw is None) and bool(current_netem) == bool(netem)):
+        commands: List[str] = []
+        if(bw is not None and float(bw) != float(current_bw)):
+            commands.append(f'class change dev {interface} parent 5:0 classid 5:1 {htb}')
+        if(netem and netem != current_netem):
+            commands.append(f'qdisc change dev {interface} {parent} handle 10: netem {netem}')
+        return commands
+
+    commands = [f'qdisc del dev {interface} root'] if(current_bw is not None or current_netem) else []
+    if(bw is not None):
+        commands.append(f'qdisc add dev {interface} root handle 5:0 htb default 1')
+        commands.append(f'class add dev {interface} parent 5:0 classid 5:1 {htb}')
+    if(netem):
+        commands.append(f'qdisc add dev {interface} {parent} handle 10: netem {netem}')
+    return commands
+
+
+def get_batch_command(commands: List[str]) -> str:
+    # A single tc process applies every change, reading them from a here-document
+    lines = '\n'.join(commands)
+    return f"tc -force -batch - <<'EOF'\n{lines}\nEOF\necho \"{BATCH_MARKER}$?\""
+
+
+def get_batch_error(output: str) -> Optional[str]:
+    match = re.search(rf'{BATCH_MARKER}(\d+)', output)
+    if(match is not None and match.group(1) == '0'):
+        return None
+    return output.replace(match.group(0), '').strip() if(match is not None) else output.strip()
@@ -1,34 +1,102 @@
-from typing import Any, List, Optional, Type
+import subprocess
+from shlex import quote
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
 
 from fogbed.emulation import Services
-from fogbed.exceptions import ContainerNotFound, NotEnoughResourcesAvailable
+from fogbed.exceptions import ContainerNotFound, LinkNotFound, LinkUpdateFailed, NotEnoughResourcesAvailable
 from fogbed.experiment import Experiment
 from fogbed.experiment.helpers import (
     verify_if_container_ip_exists,
     verify_if_container_name_exists,
     verify_if_datacenter_exists
 )
+from fogbed.experiment.link import (
+    LinkUpdate,
+    get_batch_command,
+    get_batch_error,
+    get_shaping,
+    get_shaping_commands,
+    merge_shaping,
+    set_shaping
+)
 from fogbed.net import Fogbed
-from fogbed.node import Container, VirtualInstance
+from fogbed.node import Container, LightweightHost, VirtualInstance
 from fogbed.node.services.local_docker import LocalDocker
+from fogbed.node.services.local_host import LocalHost
 from fogbed.resources.protocols import ResourceModel
+from fogbed.tracing import tracer
 
 from mininet.cli import CLI
 from mininet.log import info
-from mininet.node import Controller, Docker, OVSSwitch, Switch
+from mininet.node import Controller, Docker, Host, Node, OVSSwitch, Switch
 from mininet.topo import Topo
 
 
 class FogbedExperiment(Experiment):
-    def __init__(self, controller=Controller, switch: Type[Switch]=OVSSwitch) -> None:
+    def __init__(self, 
+        controller=Controller, 
+        switch: Type[Switch]=OVSSwitch, 
+        cgroup: bool = False,
+        max_workers: int = 1
+    ) -> None:
+        self.cgroup   = cgroup
         self.topology = Topo()
-        self.net = Fogbed(topo=self.topology, build=False, controller=controller, switch=switch)
+        self.net = Fogbed(
+            topo=self.topology, build=False, controller=controller, switch=switch, max_workers=max_workers)
     
+    @property
+    def is_running(self) -> bool:
+        return self.net.is_running
+
 
     def add_link(self, node1: VirtualInstance, node2: VirtualInstance, **params: Any):
         self.topology.addLink(node1.switch, node2.switch, **params)
 
 
+    def update_link(self, node1: VirtualInstance, node2: VirtualInstance, **params: Any):
+        self.update_links([(node1, node2, params)])
+
+
+    def update_links(self, updates: Iterable[LinkUpdate]):
+        """Changes bw, delay, jitter, loss or max_queue_size of existing links
+        in place (None removes one), with a single tc process for all of them
+        instead of removing and adding each link."""
+        commands: List[str] = []
+        # Params to store once tc applied the changes, so a failure leaves them as they were
+        changes: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+
+        def get_current(params: Dict[str, Any]) -> Dict[str, Any]:
+            return changes[id(params)][1] if(id(params) in changes) else get_shaping(params)
+
+        for node1, node2, params in updates:
+            switches = {node1.switch, node2.switch}
+            links = [link_info for src, dst, link_info in self.topology.iterLinks(withInfo=True) if({src, dst} == switches)]
+            if(not links):
+                raise LinkNotFound(node1.label, node2.label)
+            for link_info in links:
+                changes[id(link_info)] = (link_info, merge_shaping(get_current(link_info), params))
+
+            if(not self.net.is_running): continue
+            for link in self.net.linksBetween(self.net.get(node1.switch), self.net.get(node2.switch)):
+                # Both interfaces of a TCLink share their params
+                current = get_current(link.intf1.params)
+                new = merge_shaping(current, params)
+                for intf in (link.intf1, link.intf2):
+                    commands += get_shaping_commands(intf.name, current, new)
+                    changes[id(intf.params)] = (intf.params, new)
+
+        if(commands):
+            # Switches run in the root namespace, where their interfaces are
+            with tracer.span('update_links', 'network', commands=len(commands)):
+                result = subprocess.run(['sh', '-c', get_batch_command(commands)], capture_output=True, text=True)
+            error = get_batch_error(result.stdout + result.stderr)
+            if(error is not None):
+                raise LinkUpdateFailed(error)
+
+        for params, shaping in changes.values():
+            set_shaping(params, shaping)
+
+
     def add_virtual_instance(self, name: str, resource_model: Optional[ResourceModel] = None) -> VirtualInstance:
         verify_if_datacenter_exists(name)
         datacenter = VirtualInstance(name, resource_model)
@@ -39,22 +107,41 @@ class FogbedExperiment(Experiment):
 
     def add_docker(self, container: Container, datacenter: VirtualInstance):
         verify_if_container_name_exists(container.name)
-        verify_if_container_ip_exists(container.ip)
+        for ip in container.addresses:
+            verify_if_container_ip_exists(ip)
         
         try:
             datacenter.create_container(container)
         except NotEnoughResourcesAvailable:
             info(f'{container.name}: Allocation of container was blocked by resource model.\n\n')
         else:
-            self.topology.addHost(container.name, cls=Docker, **container.params)
+            lightweight = isinstance(container, LightweightHost)
+            self.topology.addHost(container.name, cls=Host if(lightweight) else Docker, **container.params)
             self.topology.addLink(container.name, datacenter.switch)
 
             if(self.net.is_running):
-                self.net.addDocker(container.name, **container.params)
+                if(lightweight): self.net.addHost(container.name, cls=Host, **container.params)
+                else: self.net.addDocker(container.name, **container.params)
                 self.net.addLink(container.name, datacenter.switch)
-                docker = self.net.getDocker(container.name)
-                docker.configDefault()
-                container.set_docker(LocalDocker(docker))
+                node = self.net.getDocker(container.name)
+                node.configDefault()
+                self._attach_service(container, node)
+    
+
+    def _attach_service(self, container: Container, node: Node):
+        if(not isinstance(container, LightweightHost)):
+            container.set_docker(LocalDocker(node, self.cgroup))
+            return
+
+        # Docker receives the limits and environment when it creates the container
+        service = LocalHost(node)
+        container.set_docker(service)
+        if(container.cpu_quota > 0 and container.cpu_period > 0):
+            service.update_cpu(container.cpu_quota, container.cpu_period)
+        if(container.mem_limit > 0):
+            service.update_memory(container.mem_limit)
+        if(container.environment):
+            service.run_command(' '.join(f'export {key}={quote(value)};' for key, value in container.environment.items()))
     
 
     def get_docker(self, name: str) -> Container:
@@ -75,22 +162,36 @@ class FogbedExperiment(Experiment):
 
     def remove_docker(self, name: str):            
         datacenter = Services.get_virtual_instance_by_container(name)
+        service = Services.get_container_by_name(name).service if(self.net.is_running) else None
         datacenter.remove_container(name)
 
         if(self.net.is_running):
             info(f'*** Removing container\n{name}\n')
             self.net.removeLink(name, datacenter.switch)
             self.net.removeDocker(name)
+            if(isinstance(service, LocalHost)):
+                service.close()
 
 
     def start_cli(self):
         CLI(self.net)
 
     def start(self):
-        self.net.start()
-        for container in self.get_containers():
-            docker = self.net.getDocker(container.name)
-            container.set_docker(LocalDocker(docker))
+        with tracer.span('experiment_start'):
+            # Topo keeps a copy of the params taken when each host was added, before
+            # resource models in batch mode (or re-balancing later) set the limits
+            for container in self.get_containers():
+                self.topology.setNodeInfo(container.name, {**self.topology.nodeInfo(container.name), **container.params})
+            self.net.start()
+
+            with tracer.span('attach_services'):
+                for container in self.get_containers():
+                    self._attach_service(container, self.net.getDocker(container.name))
 
     def stop(self):
-        self.net.stop()
+        with tracer.span('experiment_stop'):
+            self.net.stop()
+
+            for container in self.get_containers():
+                if(isinstance(container.service, LocalHost)):
+                    container.service.close()
@@ -0,0 +1,199 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from fogbed.experiment.link import SHAPING_PARAMS
+from fogbed.node.instance import VirtualInstance
+from fogbed.node.worker import Worker
+
+from mininet.log import info
+
+if TYPE_CHECKING:
+    from fogbed.experiment.distributed import FogbedDistributedExperiment
+
+MAX_REFINEMENT_PASSES = 20
+
+
+def get_weight(datacenter: VirtualInstance) -> float:
+    # Instances without a resource model weigh what their containers request
+    if(datacenter.resource_model is not None):
+        return float(datacenter.resource_model.max_cu)
+    return float(sum(container.compute_units for container in datacenter))
+
+
+class Partitioner:
+    """Assigns VirtualInstances to workers so that the bandwidth of links
+    between workers is minimal while each worker stays within its capacity
+    of compute units, then creates the worker links and tunnels.
+
+    Instances are placed greedily next to their heaviest neighbours and then
+    moved one at a time while that reduces the traffic crossing workers.
+    """
+
+    def __init__(self,
+        workers: Dict[Worker, Optional[float]],
+        imbalance: float = 0.1,
+        default_bw: float = 1.0
+    ) -> None:
+        self.workers    = list(workers)
+        self.capacities = dict(workers)
+        self.imbalance  = imbalance
+        self.default_bw = default_bw
+        self.links: List[Tuple[VirtualInstance, VirtualInstance, Dict[str, Any]]] = []
+
+
+    def add_link(self, node1: VirtualInstance, node2: VirtualInstance, **params: Any):
+        self.links.append((node1, node2, params))
+
+
+    def _get_capacities(self, instances: List[VirtualInstance]) -> Dict[Worker, float]:
+        # Workers without a capacity share the weight left by the others equally
+        total = sum(get_weight(instance) for instance in instances)
+        given = sum(capacity for capacity in self.capacities.values() if(capacity is not None))
+        missing = [worker for worker, capacity in self.capacities.items() if(capacity is None)]
+        share = max(total - given, 0.0) / len(missing) * (1 + self.imbalance) if(missing) else 0.0
+
+        return {
+            worker: share if(capacity is None) else capacity
+            for worker, capacity in self.capacities.items()
+        }
+
+
+    def _get_neighbours(self) -> Dict[str, List[Tuple[str, float]]]:
+        neighbours: Dict[str, List[Tuple[str, float]]] = {}
+        for node1, node2, params in self.links:
+            bw = float(params.get('bw', self.default_bw))
+            neighbours.setdefault(node1.label, []).append((node2.label, bw))
+            neighbours.setdefault(node2.label, []).append((node1.label, bw))
+        return neighbours
+
+
+    def partition(self, instances: List[VirtualInstance]) -> Dict[str, Worker]:
+        """Returns the worker chosen for each instance label. Instances already
+        added to a worker stay there."""
+        weights = {instance.label: get_weight(instance) for instance in instances}
+        for node1, node2, _ in self.links:
+            for node in (node1, node2):
+                if(not node.label in weights):
+                    raise Exception(f'{node.label} is linked to {node2.label if(node is node1) else node1.label} '
+                                    f'but is not among the instances to partition')
+        capacities = self._get_capacities(instances)
+        neighbours = self._get_neighbours()
+        load = {worker: 0.0 for worker in self.workers}
+        assignment: Dict[str, Worker] = {}
+
+        for worker in self.workers:
+            for datacenter in worker.datacenters.values():
+                if(datacenter.label in weights):
+                    assignment[datacenter.label] = worker
+                    load[worker] += weights[datacenter.label]
+        pinned = set(assignment)
+
+        def connection(label: str, worker: Worker) -> float:
+            return sum(bw for neighbour, bw in neighbours.get(label, []) if(assignment.get(neighbour) is worker))
+
+        # Heaviest instances first, next to the neighbours already placed
+        for label in sorted(weights, key=lambda label: -weights[label]):
+            if(label in assignment): continue
+            fits = [worker for worker in self.workers if(load[worker] + weights[label] <= capacities[worker])]
+            if(not fits):
+                info(f'*** {label} exceeds the capacity of every worker\n')
+                fits = self.workers
+
+            worker = max(fits, key=lambda worker: (
+                connection(label, worker), -load[worker] / max(capacities[worker], 1e-9)))
+            assignment[label] = worker
+            load[worker] += weights[label]
+
+        for _ in range(MAX_REFINEMENT_PASSES):
+            moved = False
+            for label in weights:
+                if(label in pinned): continue
+                current = assignment[label]
+                best, best_gain = current, 0.0
+
+                for worker in self.workers:
+                    if(worker is current or load[worker] + weights[label] > capacities[worker]): continue
+                    gain = connection(label, worker) - connection(label, current)
+                    if(gain > best_gain):
+                        best, best_gain = worker, gain
+
+                if(best is not current):
+                    assignment[label] = best
+                    load[current] -= weights[label]
+                    load[best] += weights[label]
+                    moved = True
+            if(not moved): break
+
+        return assignment
+
+
+    def cut(self, assignment: Dict[str, Worker]) -> float:
+        """Bandwidth of the links whose instances are on different workers."""
+        return sum(
+            float(params.get('bw', self.default_bw))
+            for node1, node2, params in self.links
+            if(assignment[node1.label] is not assignment[node2.label])
+        )
+
+
+    def apply(self, exp: 'FogbedDistributedExperiment', instances: List[VirtualInstance]) -> Dict[str, Worker]:
+        """Adds each instance to its worker, creates the links inside each
+        worker and one tunnel per pair of workers linked across."""
+        assignment = self.partition(instances)
+        crossing = set()
+        tunnels = set()
+
+        for node1, node2, params in self.links:
+            worker1, worker2 = assignment[node1.label], assignment[node2.label]
+            if(worker1 is not worker2):
+                crossing.update((node1.label, node2.label))
+                tunnels.add(tuple(sorted((worker1.ip, worker2.ip))))
+                # Tunnels between workers are not shaped
+                dropped = {key: value for key, value in params.items() if(key in SHAPING_PARAMS)}
+                if(dropped):
+                    info(f'*** {node1.label} <-> {node2.label} crosses workers {worker1.ip} and {worker2.ip}, '
+                         f'ignoring {", ".join(f"{key}={value}" for key, value in dropped.items())}\n')
+
+        for instance in instances:
+            worker = assignment[instance.label]
+            if(not instance.switch in worker.datacenters):
+                worker.add(instance, reachable=instance.label in crossing)
+            elif(instance.label in crossing):
+                instance.set_reachable(True)
+
+        for node1, node2, params in self.links:
+            worker = assignment[node1.label]
+            if(worker is assignment[node2.label]):
+                worker.add_link(node1, node2, **params)
+
+        for ip1, ip2 in sorted(tunnels):
+            if(not ip2 in exp.workers[ip1].tunnels):
+                exp.add_tunnel(exp.workers[ip1], exp.workers[ip2])
+        self._protect_loops(exp)
+        return assignment
+
+
+    def _protect_loops(self, exp: 'FogbedDistributedExperiment'):
+        # Tunnels forming a cycle are an L2 loop: the gateways of that group of workers need RSTP
+        pairs = {tuple(sorted((worker.ip, ip))) for worker in exp.workers.values() for ip in worker.tunnels}
+        neighbours: Dict[str, List[str]] = {}
+        for ip1, ip2 in pairs:
+            neighbours.setdefault(ip1, []).append(ip2)
+            neighbours.setdefault(ip2, []).append(ip1)
+
+        visited = set()
+        for ip in neighbours:
+            if(ip in visited): continue
+            component, stack = [], [ip]
+            visited.add(ip)
+            while(stack):
+                current = stack.pop()
+                component.append(current)
+                for neighbour in neighbours[current]:
+                    if(not neighbour in visited):
+                        visited.add(neighbour)
+                        stack.append(neighbour)
+
+            edges = sum(len(neighbours[node]) for node in component) // 2
+            if(edges >= len(component)):
+                for node in component:
+                    if(node in exp.workers): exp.workers[node].loop_protection = True
@@ -0,0 +1,162 @@
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional
+
+from fogbed.emulation import Services
+from fogbed.exceptions import ContainerNotFound, NotEnoughResourcesAvailable
+from fogbed.experiment import Experiment
+from fogbed.experiment.helpers import (
+    verify_if_container_ip_exists,
+    verify_if_container_name_exists,
+    verify_if_datacenter_exists
+)
+from fogbed.node.container import Container
+from fogbed.node.instance import VirtualInstance
+from fogbed.resources.protocols import ResourceModel
+
+from mininet.log import info
+
+
+class DryRunExperiment(Experiment):
+    """Runs the resource models of a topology without Docker or a network,
+    to size Services(max_cpu, max_mem) and the max_cu/max_mu of each model.
+
+    Every instance stays inside a batch while containers are added, so the
+    Cloud and Fog models re-balance once per instance instead of once per
+    container. Adding an instance changes the totals every model depends on,
+    so pending batches are applied first, like a real experiment would.
+    """
+
+    def __init__(self) -> None:
+        self.rejected: Dict[str, str] = {}
+        self._batches = ExitStack()
+        self.is_running = False
+
+
+    def add_virtual_instance(self, name: str, resource_model: Optional[ResourceModel] = None) -> VirtualInstance:
+        verify_if_datacenter_exists(name)
+        self._apply()
+
+        datacenter = VirtualInstance(name, resource_model)
+        Services.add_virtual_instance(datacenter)
+        self._batches.enter_context(datacenter.batch())
+        return datacenter
+
+
+    def add_docker(self, container: Container, datacenter: VirtualInstance):
+        verify_if_container_name_exists(container.name)
+        for ip in container.addresses:
+            verify_if_container_ip_exists(ip)
+
+        try:
+            datacenter.create_container(container)
+        except NotEnoughResourcesAvailable:
+            self.rejected[container.name] = datacenter.label
+
+
+    def get_docker(self, name: str) -> Container:
+        container = Services.get_container_by_name(name)
+
+        if(container is None):
+            raise ContainerNotFound(f'Container {name} not found.')
+        return container
+
+
+    def get_containers(self) -> List[Container]:
+        return Services.get_all_containers()
+
+
+    def get_virtual_instances(self) -> List[VirtualInstance]:
+        return list(Services.virtual_instances().values())
+
+
+    def remove_docker(self, name: str):
+        datacenter = Services.get_virtual_instance_by_container(name)
+        datacenter.remove_container(name)
+
+
+    def _apply(self):
+        # Closing the stack commits every batch, then each instance gets a new one
+        self._batches.close()
+        self._batches = ExitStack()
+        for datacenter in Services.virtual_instances().values():
+            self._batches.enter_context(datacenter.batch())
+
+
+    def plan(self) -> Dict[str, Any]:
+        """Limits assigned to each container, rejected containers and the
+        utilization of each instance and of the host share given to Services."""
+        self._apply()
+        containers: Dict[str, Dict[str, Any]] = {}
+        instances: Dict[str, Dict[str, Any]] = {}
+
+        for datacenter in self.get_virtual_instances():
+            cpu_percent = 0.0
+            mem_limit = 0
+
+            for container in datacenter:
+                share = self._cpu_percent(container)
+                containers[container.name] = {
+                    'instance':    datacenter.label,
+                    'cpu_quota':   container.cpu_quota,
+                    'cpu_period':  container.cpu_period,
+                    'cpu_percent': share,
+                    'mem_limit':   container.mem_limit,
+                }
+                cpu_percent += share
+                mem_limit += max(container.mem_limit, 0)
+
+            instances[datacenter.label] = {
+                'containers':  len(datacenter.containers),
+                'cpu_percent': cpu_percent,
+                'mem_limit':   mem_limit,
+                **self._utilization(datacenter.resource_model),
+            }
+
+        host_cpu = sum(instance['cpu_percent'] for instance in instances.values())
+        host_mem = sum(instance['mem_limit'] for instance in instances.values())
+        return {
+            'containers': containers,
+            'rejected':   dict(self.rejected),
+            'instances':  instances,
+            'host': {
+                'max_cpu_percent':     Services.cpu_percentage() * 100,
+                'cpu_percent':         host_cpu,
+                'cpu_utilization':     host_cpu / (Services.cpu_percentage() * 100),
+                'max_mem_limit':       Services.memory_in_megabytes() * 1024 * 1024,
+                'mem_limit':           host_mem,
+                'memory_utilization':  host_mem / (Services.memory_in_megabytes() * 1024 * 1024),
+            }
+        }
+
+
+    def _cpu_percent(self, container: Container) -> float:
+        if(container.cpu_quota <= 0 or container.cpu_period <= 0): return 0.0
+        return container.cpu_quota / container.cpu_period * 100
+
+    def _utilization(self, model: Optional[ResourceModel]) -> Dict[str, Any]:
+        if(model is None): return {}
+        # Cloud and Fog models over-provision, so utilization can exceed 1; an
+        # instance without capacity reports 0
+        return {
+            'max_cu':          model.max_cu,
+            'allocated_cu':    model.allocated_cu,
+            'cu_utilization':  model.allocated_cu / model.max_cu if(model.max_cu > 0) else 0.0,
+            'max_mu':          model.max_mu,
+            'allocated_mu':    model.allocated_mu,
+            'mu_utilization':  model.allocated_mu / model.max_mu if(model.max_mu > 0) else 0.0,
+        }
+
+
+    def start(self):
+        plan = self.plan()
+        self.is_running = True
+
+        for label, instance in plan['instances'].items():
+            info(f'{label}: {instance["containers"]} containers, '
+                 f'cpu={instance["cpu_percent"]:.1f}%, mem={instance["mem_limit"] // (1024 * 1024)}MB\n')
+        if(plan['rejected']):
+            info(f'*** Rejected by the resource models: {", ".join(plan["rejected"])}\n')
+
+    def stop(self):
+        self._batches.close()
+        self.is_running = False
@@ -0,0 +1,255 @@
+import heapq
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from itertools import count
+from threading import Event, Lock, Thread
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from fogbed.experiment.link import LinkUpdate
+from fogbed.node.container import Container
+from fogbed.node.instance import VirtualInstance
+from fogbed.tracing import tracer
+
+from mininet.log import info
+
+if TYPE_CHECKING:
+    from fogbed.experiment import Experiment
+
+# Link changes due within this window are sent in one update_links call
+BATCH_WINDOW = 0.01
+
+# Key shared by the actions that change which containers exist
+TOPOLOGY = '*'
+
+# CFS period of Docker, for containers created without one
+DEFAULT_CPU_PERIOD = 100000
+
+
+class TimelineEvent:
+    def __init__(self,
+        t: float,
+        name: str,
+        action: Callable[[], Any],
+        keys: Iterable[str] = (),
+        structural: bool = False
+    ) -> None:
+        self.time       = t
+        self.name       = name
+        self.action     = action
+        self.keys       = list(keys)
+        self.structural = structural
+        self.link: Optional[LinkUpdate] = None
+        self.batch: List['TimelineEvent'] = []
+
+    def __repr__(self) -> str:
+        return f'TimelineEvent(time={self.time}, name={self.name})'
+
+
+class Timeline:
+    """Scenario of actions at given times, in seconds since run() or start().
+
+    A single thread takes the events from a heap when they are due and
+    dispatches them to a thread pool, so actions at the same time run
+    concurrently. Actions on the same container or link still run in the
+    order they were planned, and adding or removing containers runs one at a
+    time, since it changes the network. The log keeps, for every event, when
+    it was planned, started and finished.
+    """
+
+    def __init__(self, experiment: 'Experiment', max_workers: int = 16) -> None:
+        self.experiment = experiment
+        self.max_workers = max_workers
+        self.events: List[Tuple[float, int, TimelineEvent]] = []
+        self.log: List[Dict[str, Any]] = []
+        self._counter = count()
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+
+    def at(self, t: float, action: Callable[[], Any], name: Optional[str] = None, keys: Iterable[str] = ()) -> TimelineEvent:
+        """Runs any callable at t; actions sharing a key run in order."""
+        if(self._thread is not None):
+            raise Exception('Events cannot be added after the timeline was started')
+        if(t < 0):
+            raise Exception(f'Events cannot happen before the start, got t={t}')
+        event = TimelineEvent(t, name or getattr(action, '__name__', 'action'), action, keys)
+        heapq.heappush(self.events, (t, next(self._counter), event))
+        return event
+
+    def add_docker(self, t: float, container: Container, datacenter: VirtualInstance) -> TimelineEvent:
+        event = self.at(t, lambda: self.experiment.add_docker(container, datacenter),
+                        f'add_docker {container.name}', [container.name, TOPOLOGY])
+        event.structural = True
+        return event
+
+    def remove_docker(self, t: float, name: str) -> TimelineEvent:
+        event = self.at(t, lambda: self.experiment.remove_docker(name), f'remove_docker {name}', [name, TOPOLOGY])
+        event.structural = True
+        return event
+
+    def update_link(self, t: float, node1: VirtualInstance, node2: VirtualInstance, **params: Any) -> TimelineEvent:
+        event = self.at(t, lambda: self.experiment.update_links([(node1, node2, params)]),
+                        f'update_link {node1.label}-{node2.label}', [get_link_key(node1, node2)])
+        event.link = (node1, node2, params)
+        return event
+
+    def update_resources(self,
+        t: float,
+        name: str,
+        cpu_quota: Optional[int] = None,
+        cpu_period: Optional[int] = None,
+        mem_limit: Optional[int] = None
+    ) -> TimelineEvent:
+        def update():
+            container = self.experiment.get_docker(name)
+            if(cpu_quota is not None):
+                period = container.cpu_period if(cpu_period is None) else cpu_period
+                container.update_cpu(cpu_quota, period if(period > 0) else DEFAULT_CPU_PERIOD)
+            if(mem_limit is not None):
+                container.update_memory(mem_limit)
+        return self.at(t, update, f'update_resources {name}', [name])
+
+    def cmd(self,
+        t: float,
+        command: str,
+        targets: Union[VirtualInstance, Iterable[Container], None] = None
+    ) -> TimelineEvent:
+        """Runs command at t on every target container, all at once."""
+        if(targets is None or isinstance(targets, VirtualInstance)):
+            keys = [TOPOLOGY]
+        else:
+            targets = list(targets)
+            keys = [container.name for container in targets]
+        return self.at(t, lambda: self.experiment.cmd(command, targets), f'cmd {command[:40]}', keys)
+
+
+    def start(self):
+        if(self._thread is not None and self._thread.is_alive()):
+            raise Exception('The timeline is already running')
+        self.log = []
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, args=(time.monotonic(),), daemon=True)
+        self._thread.start()
+
+    def run(self) -> List[Dict[str, Any]]:
+        self.start()
+        self.wait()
+        return self.log
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every event finished; False on timeout."""
+        if(self._thread is not None):
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def stop(self):
+        """Dispatches no more events; the running ones are waited for."""
+        self._stop_event.set()
+        self.wait()
+
+
+    def _run(self, origin: float):
+        events = list(self.events)
+        last: Dict[str, Future] = {}
+        futures: List[Future] = []
+
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix='fogbed-timeline') as pool, \
+             ThreadPoolExecutor(1, thread_name_prefix='fogbed-topology') as topology:
+            while(events and not self._stop_event.is_set()):
+                delay = origin + events[0][0] - time.monotonic()
+                if(delay > 0 and self._stop_event.wait(delay)):
+                    break
+
+                due: List[TimelineEvent] = []
+                while(events and origin + events[0][0] <= time.monotonic() + BATCH_WINDOW):
+                    due.append(heapq.heappop(events)[2])
+
+                for event in self._batch_links(due):
+                    dependencies = [last[key] for key in event.keys if(key in last)]
+                    executor = topology if(event.structural) else pool
+                    future = self._dispatch(executor, event, origin, dependencies)
+                    for key in event.keys:
+                        last[key] = future
+                    futures.append(future)
+
+            wait(futures)
+
+    def _batch_links(self, due: List[TimelineEvent]) -> List[TimelineEvent]:
+        # Link changes due together become one update_links call, logged per change
+        links = [event for event in due if(event.link is not None)]
+        if(len(links) < 2):
+            return due
+
+        def update():
+            self.experiment.update_links([event.link for event in links])
+
+        keys = sorted({key for event in links for key in event.keys})
+        batch = TimelineEvent(links[0].time, f'update_links ({len(links)})', update, keys)
+        batch.batch = links
+        return [event for event in due if(event.link is None)] + [batch]
+
+    def _dispatch(self,
+        executor: ThreadPoolExecutor,
+        event: TimelineEvent,
+        origin: float,
+        dependencies: List[Future]
+    ) -> Future:
+        # The event is submitted once its dependencies finished, so no pool
+        # thread is kept waiting; the returned future is done with the event
+        done: Future = Future()
+        remaining = [len(dependencies) + 1]
+
+        def release(_: Optional[Future] = None):
+            with self._lock:
+                remaining[0] -= 1
+                if(remaining[0] > 0): return
+            executor.submit(self._execute, event, origin, done)
+
+        for dependency in dependencies:
+            dependency.add_done_callback(release)
+        release()
+        return done
+
+    def _execute(self, event: TimelineEvent, origin: float, done: Future):
+        started = time.monotonic() - origin
+        error: Optional[str] = None
+        try:
+            with tracer.span(event.name, 'timeline', planned=event.time):
+                event.action()
+        except Exception as ex:
+            info(f'*** {event.name} failed at t={started:.3f}s: {ex}\n')
+            error = str(ex)
+        finished = time.monotonic() - origin
+
+        with self._lock:
+            for planned in event.batch or [event]:
+                self.log.append({
+                    'name':        planned.name,
+                    'planned_s':   planned.time,
+                    'started_s':   started,
+                    'finished_s':  finished,
+                    'lag_ms':      (started - planned.time) * 1e3,
+                    'duration_ms': (finished - started) * 1e3,
+                    'error':       error,
+                })
+        done.set_result(None)
+
+
+    def summary(self) -> Dict[str, Any]:
+        """Lag between planned and actual start of the events, in milliseconds."""
+        lags = sorted(record['lag_ms'] for record in self.log)
+        if(not lags):
+            return {'events': 0, 'errors': 0}
+        return {
+            'events':     len(lags),
+            'errors':     sum(1 for record in self.log if(record['error'] is not None)),
+            'mean_lag_ms': sum(lags) / len(lags),
+            'p95_lag_ms': lags[min(int(len(lags) * 0.95), len(lags) - 1)],
+            'max_lag_ms': lags[-1],
+        }
+
+
+def get_link_key(node1: VirtualInstance, node2: VirtualInstance) -> str:
+    return '-'.join(sorted((node1.switch, node2.switch)))
@@ -0,0 +1,258 @@
+import csv
+import heapq
+import mmap
+import os
+import statistics
+import time
+from array import array
+from threading import Event, Thread
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fogbed.experiment.link import SHAPING_PARAMS, LinkUpdate
+from fogbed.node.instance import VirtualInstance
+from fogbed.tracing import tracer
+
+from mininet.log import info
+
+# Columns given in milliseconds, which tc expects with their unit
+TIME_COLUMNS = ('delay', 'jitter')
+
+# Changes due within this window are applied together
+BATCH_WINDOW = 0.01
+
+# Consecutive failed changes after which a link stops being replayed
+MAX_FAILURES = 3
+
+
+def parse_line(line: bytes) -> List[str]:
+    return next(csv.reader([line.decode()]), [])
+
+
+class LinkTrace:
+    """Time series of link conditions read from a CSV file with a header such
+    as time,bw,delay,jitter,loss: seconds since the start, Mbit/s,
+    milliseconds and percent. Empty cells keep the previous value.
+
+    The file is memory-mapped and read one row at a time, so a trace costs
+    the same memory whatever its length and is shared by every link using it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        if(os.path.getsize(path) == 0):
+            raise Exception(f'{path}: the trace is empty')
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        end = self.data.find(b'\n')
+        header = self.data[:end if(end >= 0) else len(self.data)].strip()
+        self.columns = [column.strip() for column in parse_line(header)]
+        self.start = len(self.data) if(end < 0) else end + 1
+
+        if(not self.columns or self.columns[0] != 'time'):
+            raise Exception(f'{path}: the first column must be time')
+        unknown = [column for column in self.columns[1:] if(not column in SHAPING_PARAMS)]
+        if(unknown):
+            raise Exception(f'{path}: unknown columns {", ".join(unknown)}, expected {SHAPING_PARAMS}')
+
+
+    def rows(self) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        position, previous, line_number = self.start, float('-inf'), 1
+        while(position < len(self.data)):
+            end = self.data.find(b'\n', position)
+            if(end < 0): end = len(self.data)
+            line = self.data[position:end].strip()
+            position = end + 1
+            line_number += 1
+            if(not line or line.startswith(b'#')): continue
+
+            cells = parse_line(line)
+            try:
+                timestamp = float(cells[0])
+            except ValueError:
+                raise Exception(f'{self.path}:{line_number}: invalid time {cells[0]!r}')
+            if(timestamp < previous):
+                raise Exception(f'{self.path}:{line_number}: time goes backwards')
+            previous = timestamp
+            try:
+                params = self._parse(cells[1:])
+            except ValueError as ex:
+                raise Exception(f'{self.path}:{line_number}: {ex}')
+            yield timestamp, params
+
+
+    def _parse(self, cells: List[str]) -> Dict[str, Any]:
+        params: Dict[str, Any] = {}
+        for column, cell in zip(self.columns[1:], cells):
+            cell = cell.strip()
+            if(not cell): continue
+            params[column] = f'{float(cell):g}ms' if(column in TIME_COLUMNS) else float(cell)
+        return params
+
+    def close(self):
+        self.data.close()
+
+
+class TraceScheduler:
+    """Replays traces on links of a running experiment from a single thread.
+
+    The next change of every link waits in a heap; changes due within
+    BATCH_WINDOW of each other go out in one update_links call, and a link
+    that fell behind only gets its latest change. The drift is how late each
+    change was applied relative to its time in the trace. A link whose
+    changes fail MAX_FAILURES times in a row stops being replayed.
+    """
+
+    def __init__(self, experiment: Any, late_threshold: float = 0.1) -> None:
+        self.experiment = experiment
+        self.late_threshold = late_threshold
+        self.traces: Dict[str, LinkTrace] = {}
+        self.links: List[Tuple[VirtualInstance, VirtualInstance, LinkTrace, float]] = []
+        self.drifts = array('d')
+        self.skipped = 0
+        self.errors: List[Exception] = []
+        self.failed: List[str] = []
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+
+    def add_trace(self, node1: VirtualInstance, node2: VirtualInstance, path: str, offset: float = 0.0):
+        """Replays the trace at path on the link between node1 and node2,
+        shifted by offset seconds."""
+        if(not path in self.traces):
+            self.traces[path] = LinkTrace(path)
+        self.links.append((node1, node2, self.traces[path], offset))
+
+
+    def start(self):
+        if(self._thread is not None and self._thread.is_alive()):
+            raise Exception('The trace scheduler is already running')
+        if(not self.experiment.is_running):
+            raise Exception('The experiment must be running to replay traces')
+        self.drifts = array('d')
+        self.skipped = 0
+        self.errors = []
+        self.failed = []
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, args=(time.monotonic(),), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if(self._thread is not None):
+            self._thread.join()
+            self._thread = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every trace was replayed; False on timeout."""
+        if(self._thread is not None):
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+    def _run(self, origin: float):
+        cursors = [trace.rows() for _, _, trace, _ in self.links]
+        heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        for index, cursor in enumerate(cursors):
+            self._push(heap, index, cursor)
+        failures = [0] * len(self.links)
+
+        while(heap and not self._stop_event.is_set()):
+            due = origin + heap[0][0]
+            delay = due - time.monotonic()
+            if(delay > 0 and self._stop_event.wait(delay)):
+                break
+
+            # Everything due in the window goes out together, latest change per link
+            now = time.monotonic()
+            pending: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+            while(heap and origin + heap[0][0] <= now + BATCH_WINDOW):
+                scheduled, index, params = heapq.heappop(heap)
+                if(failures[index] >= MAX_FAILURES): continue
+                if(index in pending):
+                    self.skipped += 1
+                    params = {**pending[index][1], **params}
+                pending[index] = (scheduled, params)
+                self._push(heap, index, cursors[index])
+
+            with tracer.span('replay_traces', 'network', links=len(pending)):
+                failed = self._apply({index: params for index, (_, params) in pending.items()})
+
+            applied = time.monotonic()
+            for index, (scheduled, _) in pending.items():
+                if(not index in failed):
+                    failures[index] = 0
+                    self.drifts.append(applied - (origin + scheduled))
+                    continue
+
+                failures[index] += 1
+                if(failures[index] == MAX_FAILURES):
+                    self.failed.append(self._label(index))
+                    info(f'*** Stopped replaying the trace on {self._label(index)} after {MAX_FAILURES} failed changes\n')
+
+    def _apply(self, pending: Dict[int, Dict[str, Any]]) -> List[int]:
+        # On failure each link is retried alone to find the ones that fail
+        updates: List[LinkUpdate] = [(self.links[index][0], self.links[index][1], params) for index, params in pending.items()]
+        try:
+            self.experiment.update_links(updates)
+            return []
+        except Exception as ex:
+            if(len(updates) == 1):
+                info(f'*** Could not apply the trace on {self._label(*pending)}: {ex}\n')
+                self.errors.append(ex)
+                return list(pending)
+
+        failed: List[int] = []
+        for index, update in zip(pending, updates):
+            try:
+                self.experiment.update_links([update])
+            except Exception as ex:
+                info(f'*** Could not apply the trace on {self._label(index)}: {ex}\n')
+                self.errors.append(ex)
+                failed.append(index)
+        return failed
+
+    def _label(self, index: int) -> str:
+        return f'{self.links[index][0].label} <-> {self.links[index][1].label}'
+
+    def _push(self, heap: List[Tuple[float, int, Dict[str, Any]]], index: int, cursor: Iterator[Tuple[float, Dict[str, Any]]]):
+        # Rows are parsed as they are replayed: an invalid one ends the trace of its link only
+        try:
+            for timestamp, params in cursor:
+                if(params):
+                    heapq.heappush(heap, (timestamp + self.links[index][3], index, params))
+                    return
+        except Exception as ex:
+            info(f'*** Stopped replaying the trace on {self._label(index)}: {ex}\n')
+            self.errors.append(ex)
+            self.failed.append(self._label(index))
+
+
+    def drift(self) -> Dict[str, float]:
+        """Drift between scheduled and applied changes, in milliseconds."""
+        if(not self.drifts):
+            return {'changes': 0, 'skipped': self.skipped, 'errors': len(self.errors), 'failed': len(self.failed)}
+
+        drifts = sorted(self.drifts)
+        return {
+            'changes': len(drifts),
+            'skipped': self.skipped,
+            'errors':  len(self.errors),
+            'failed':  len(self.failed),
+            'late':    sum(1 for value in drifts if(value > self.late_threshold)),
+            'mean_ms': statistics.fmean(drifts) * 1e3,
+            'p50_ms':  drifts[len(drifts) // 2] * 1e3,
+            'p95_ms':  drifts[min(int(len(drifts) * 0.95), len(drifts) - 1)] * 1e3,
+            'max_ms':  drifts[-1] * 1e3,
+        }
+
+    def close(self):
+        self.stop()
+        for trace in self.traces.values():
+            trace.close()
+        self.traces.clear()
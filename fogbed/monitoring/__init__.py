@@ -0,0 +1,3 @@
+from fogbed.monitoring.buffers import RingBuffer
+from fogbed.monitoring.links import LinkStatsCollector
+from fogbed.monitoring.resources import ResourceSampler
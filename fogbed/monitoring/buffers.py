@@ -0,0 +1,43 @@
+from typing import List
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size time series for a group of series sampled together.
+
+    Samples live in a preallocated array of shape (series, capacity, fields);
+    once full, the oldest sample of every series is overwritten.
+    """
+
+    def __init__(self, series: int, fields: List[str], capacity: int, dtype=np.float64) -> None:
+        self.fields     = fields
+        self.capacity   = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.data       = np.full((series, capacity, len(fields)), np.nan, dtype=dtype)
+        self.head       = 0
+        self.size       = 0
+
+
+    def append(self, timestamp: float, values: np.ndarray):
+        self.timestamps[self.head] = timestamp
+        self.data[:, self.head, :] = values
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _order(self) -> np.ndarray:
+        start = (self.head - self.size) % self.capacity
+        return (start + np.arange(self.size)) % self.capacity
+
+    def times(self) -> np.ndarray:
+        return self.timestamps[self._order()]
+
+    def values(self, field: str) -> np.ndarray:
+        """Returns an array of shape (series, samples) ordered from the oldest sample."""
+        return self.data[:, self._order(), self.fields.index(field)]
+
+    def last(self) -> np.ndarray:
+        return self.data[:, (self.head - 1) % self.capacity, :]
+
+    def __len__(self) -> int:
+        return self.size
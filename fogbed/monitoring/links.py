@@ -0,0 +1,241 @@
+import re
+import subprocess
+import time
+from threading import Event, Thread
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fogbed.monitoring.buffers import RingBuffer
+from fogbed.node.services.session import get_session
+from fogbed.node.worker import Worker
+
+from mininet.node import Switch
+
+STATISTICS = ['rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets', 'rx_dropped', 'tx_dropped']
+QDISC_MARKER = '--- qdisc ---'
+
+FIELDS = [
+    'rx_bytes',       # cumulative
+    'tx_bytes',       # cumulative
+    'rx_mbps',        # since the previous sample
+    'tx_mbps',        # since the previous sample
+    'drops',          # cumulative, interface and qdisc drops
+    'overlimits',     # cumulative, qdisc
+    'backlog_bytes',  # queued in the qdisc when sampled
+    'utilization',    # max(rx, tx) / configured bw, nan without bw
+]
+
+# (label, configured bandwidth in Mbit/s) of each switch interface
+LinkInfo = Tuple[str, Optional[float]]
+
+
+def get_statistics_command(interfaces: List[str]) -> str:
+    # A single grep reads every counter file, so a sample costs two processes
+    files = ' '.join(
+        f'/sys/class/net/{interface}/statistics/{statistic}'
+        for interface in interfaces for statistic in STATISTICS
+    )
+    return f'grep -H "" {files} 2>/dev/null; echo "{QDISC_MARKER}"; tc -s qdisc show'
+
+
+def parse_statistics(output: str) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Dict[str, float]]]:
+    counters: Dict[str, Dict[str, float]] = {}
+    qdiscs: Dict[str, Dict[str, float]] = {}
+    section = 'counters'
+    device = ''
+
+    for line in output.splitlines():
+        line = line.strip()
+        if(line == QDISC_MARKER):
+            section = 'qdisc'
+            continue
+
+        if(section == 'counters'):
+            match = re.match(r'/sys/class/net/([^/]+)/statistics/(\w+):(\d+)', line)
+            if(match is not None):
+                counters.setdefault(match.group(1), {})[match.group(2)] = float(match.group(3))
+            continue
+
+        header = re.match(r'qdisc \S+ \S+ dev (\S+)', line)
+        if(header is not None):
+            device = header.group(1)
+            qdiscs.setdefault(device, {'dropped': 0.0, 'overlimits': 0.0, 'backlog': 0.0})
+            continue
+
+        # The root qdisc already accounts for its children, so keep the largest value
+        stats = qdiscs.get(device)
+        if(stats is None): continue
+        sent = re.search(r'dropped (\d+), overlimits (\d+)', line)
+        if(sent is not None):
+            stats['dropped']    = max(stats['dropped'], float(sent.group(1)))
+            stats['overlimits'] = max(stats['overlimits'], float(sent.group(2)))
+        backlog = re.match(r'backlog (\d+)b', line)
+        if(backlog is not None):
+            stats['backlog'] = max(stats['backlog'], float(backlog.group(1)))
+
+    return counters, qdiscs
+
+
+class LocalLinks:
+    def __init__(self, net: Any) -> None:
+        self.net = net
+
+    def interfaces(self) -> Dict[str, LinkInfo]:
+        # Switches live in the root namespace, so their side of each link is sampled
+        interfaces: Dict[str, LinkInfo] = {}
+        for link in self.net.links:
+            label = f'{link.intf1.node.name}-{link.intf2.node.name}'
+            for intf in (link.intf1, link.intf2):
+                if(isinstance(intf.node, Switch)):
+                    interfaces[intf.name] = (label, intf.params.get('bw'))
+        return interfaces
+
+    def run(self, command: str) -> str:
+        return subprocess.run(['sh', '-c', command], capture_output=True, text=True).stdout
+
+
+class RemoteLinks:
+    def __init__(self, worker: Worker) -> None:
+        self.worker  = worker
+        self.session = get_session(worker.net.url)
+        self.node    = next(iter(worker.datacenters.values())).switch
+
+    def interfaces(self) -> Dict[str, LinkInfo]:
+        switches = [datacenter.switch for datacenter in self.worker.datacenters.values()]
+        bandwidths = {}
+        for link in self.worker.links:
+            bandwidths[(link.node1, link.node2)] = link.params.get('bw')
+            bandwidths[(link.node2, link.node1)] = link.params.get('bw')
+
+        output = self.run('ip -o link show')
+        interfaces: Dict[str, LinkInfo] = {}
+        for name, peer in re.findall(r'^\d+: ([^@:\s]+)@([^:\s]+):', output, re.MULTILINE):
+            node = name.split('-eth')[0]
+            if(not node in switches): continue
+
+            # Peers in another namespace, like containers, only show up as ifN
+            if(not '-eth' in peer):
+                interfaces[name] = (name, None)
+                continue
+            peer_node = peer.split('-eth')[0]
+            interfaces[name] = (f'{node}-{peer_node}', bandwidths.get((node, peer_node)))
+        return interfaces
+
+    def run(self, command: str) -> str:
+        return self.session.post(f'/hosts/{self.node}/cmd', {'command': command})
+
+
+class LinkStatsCollector:
+    """Samples interface and tc qdisc counters of every switch port at a fixed
+    interval, for local experiments or for each worker of a distributed one."""
+
+    def __init__(self,
+        experiment: Any,
+        interval: float = 1.0,
+        capacity: int = 600,
+        saturation: float = 0.9
+    ) -> None:
+        self.interval   = interval
+        self.saturation = saturation
+        self.sources    = self._get_sources(experiment)
+        self.interfaces: List[Tuple[Any, str]] = []
+        self.links: List[LinkInfo] = []
+        self.commands: List[str] = []
+
+        for source in self.sources:
+            interfaces = source.interfaces()
+            for name, info in interfaces.items():
+                self.interfaces.append((source, name))
+                self.links.append(info)
+            self.commands.append(get_statistics_command(list(interfaces)))
+
+        self.bandwidth = np.array([np.nan if(bw is None) else bw for _, bw in self.links], dtype=np.float64)
+        self.buffer = RingBuffer(len(self.interfaces), FIELDS, capacity)
+        self._previous: Optional[np.ndarray] = None
+        self._previous_time = 0.0
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+
+    def _get_sources(self, experiment: Any) -> List[Any]:
+        workers = getattr(experiment, 'workers', None)
+        if(workers is not None):
+            return [RemoteLinks(worker) for worker in workers.values()]
+        return [LocalLinks(experiment.net)]
+
+
+    def sample(self):
+        now = time.time()
+        values = np.full((len(self.interfaces), len(FIELDS)), np.nan, dtype=np.float64)
+        index = 0
+
+        for source, command in zip(self.sources, self.commands):
+            counters, qdiscs = parse_statistics(source.run(command))
+
+            while(index < len(self.interfaces) and self.interfaces[index][0] is source):
+                name = self.interfaces[index][1]
+                counter = counters.get(name, {})
+                qdisc = qdiscs.get(name, {})
+                values[index, 0] = counter.get('rx_bytes', np.nan)
+                values[index, 1] = counter.get('tx_bytes', np.nan)
+                values[index, 4] = counter.get('rx_dropped', 0) + counter.get('tx_dropped', 0) + qdisc.get('dropped', 0)
+                values[index, 5] = qdisc.get('overlimits', 0)
+                values[index, 6] = qdisc.get('backlog', 0)
+                index += 1
+
+        if(self._previous is not None):
+            elapsed = now - self._previous_time
+            values[:, 2] = (values[:, 0] - self._previous[:, 0]) * 8 / elapsed / 1e6
+            values[:, 3] = (values[:, 1] - self._previous[:, 1]) * 8 / elapsed / 1e6
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values[:, 7] = np.fmax(values[:, 2], values[:, 3]) / self.bandwidth
+
+        self._previous = values
+        self._previous_time = now
+        self.buffer.append(now, values)
+
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name='fogbed-link-stats', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_sample = time.monotonic()
+        while(not self._stop_event.is_set()):
+            self.sample()
+            next_sample += self.interval
+            self._stop_event.wait(max(0.0, next_sample - time.monotonic()))
+
+    def stop(self):
+        self._stop_event.set()
+        if(self._thread is not None):
+            self._thread.join()
+
+
+    def saturated_links(self, samples: int = 5, threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Interfaces whose mean utilization over the last samples reached the
+        threshold, or that kept dropping packets with a non-empty queue."""
+        threshold = self.saturation if(threshold is None) else threshold
+        if(len(self.buffer) < 2): return []
+
+        window      = min(samples, len(self.buffer))
+        utilization = self.buffer.values('utilization')[:, -window:]
+        drops       = self.buffer.values('drops')[:, -window:]
+        backlog     = self.buffer.values('backlog_bytes')[:, -window:]
+
+        with np.errstate(invalid='ignore'):
+            mean_utilization = np.nanmean(np.where(np.isnan(utilization), 0, utilization), axis=1)
+        new_drops = drops[:, -1] - drops[:, 0]
+
+        flagged = np.flatnonzero((mean_utilization >= threshold) | ((new_drops > 0) & (backlog[:, -1] > 0)))
+        return [
+            {
+                'interface': self.interfaces[index][1],
+                'link': self.links[index][0],
+                'utilization': float(mean_utilization[index]),
+                'drops': float(new_drops[index]),
+            }
+            for index in flagged
+        ]
@@ -0,0 +1,239 @@
+import csv
+import os
+import resource
+import time
+from threading import Event, Thread
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from fogbed.emulation import Services
+from fogbed.monitoring.buffers import RingBuffer
+from fogbed.node.container import Container
+from fogbed.node.services.cgroup import get_cgroup_paths, is_unified_hierarchy
+from fogbed.node.services.local_docker import LocalDocker
+
+from mininet.log import info
+
+FIELDS = [
+    'cpu_usage',          # cumulative cpu time in seconds
+    'cpu_percent',        # cpu used since the previous sample, 100 = one core
+    'cpu_limit_percent',  # cpu_quota / cpu_period assigned by the resource model
+    'throttled_periods',  # cumulative number of throttled periods
+    'throttled_time',     # cumulative throttled time in seconds
+    'memory_usage',       # bytes
+    'memory_limit',       # bytes assigned by the resource model
+]
+
+
+class CgroupCounters:
+    """Keeps the counter files of a container open and re-reads them with pread."""
+
+    def __init__(self, pid: int) -> None:
+        paths = get_cgroup_paths(pid)
+        self.unified = is_unified_hierarchy()
+
+        if(self.unified):
+            files = {'cpu': os.path.join(paths['cpu'], 'cpu.stat'),
+                     'memory': os.path.join(paths['memory'], 'memory.current')}
+        else:
+            files = {'cpu': os.path.join(paths['cpu'], 'cpu.stat'),
+                     'cpuacct': os.path.join(paths.get('cpuacct', paths['cpu']), 'cpuacct.usage'),
+                     'memory': os.path.join(paths['memory'], 'memory.usage_in_bytes')}
+        self.fds = {name: os.open(path, os.O_RDONLY) for name, path in files.items()}
+
+
+    def read(self) -> List[float]:
+        cpu_stat = self._read_stat('cpu')
+        memory   = float(self._read('memory'))
+
+        if(self.unified):
+            usage     = cpu_stat.get('usage_usec', 0) / 1e6
+            throttled = cpu_stat.get('throttled_usec', 0) / 1e6
+        else:
+            usage     = float(self._read('cpuacct')) / 1e9
+            throttled = cpu_stat.get('throttled_time', 0) / 1e9
+
+        return [usage, cpu_stat.get('nr_throttled', 0), throttled, memory]
+
+    def _read(self, name: str) -> str:
+        return os.pread(self.fds[name], 4096, 0).decode()
+
+    def _read_stat(self, name: str) -> Dict[str, float]:
+        stat: Dict[str, float] = {}
+        for line in self._read(name).splitlines():
+            key, _, value = line.partition(' ')
+            stat[key] = float(value)
+        return stat
+
+    def close(self):
+        for fd in self.fds.values():
+            os.close(fd)
+
+
+class ResourceSampler:
+    """Samples cpu, throttling and memory counters of local containers from
+    their cgroups at a fixed interval into a RingBuffer."""
+
+    def __init__(self,
+        containers: Iterable[Container],
+        interval: float = 1.0,
+        capacity: int = 600
+    ) -> None:
+        self.interval   = interval
+        self.containers: List[Container] = []
+        self.instances: List[str] = []
+        self.counters: List[Optional[CgroupCounters]] = []
+
+        containers = list(containers)
+        self._raise_open_files_limit(3 * len(containers) + 256)
+        for container in containers:
+            counters = self._open_counters(container)
+            if(counters is not None):
+                self.containers.append(container)
+                self.instances.append(Services.get_virtual_instance_by_container(container.name).label)
+                self.counters.append(counters)
+
+        self.buffer = RingBuffer(len(self.containers), FIELDS, capacity)
+        self._previous: Optional[np.ndarray] = None
+        self._previous_time = 0.0
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+
+    def _raise_open_files_limit(self, required: int):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if(soft != resource.RLIM_INFINITY and soft < required):
+            limit = required if(hard == resource.RLIM_INFINITY) else min(required, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+
+    def _open_counters(self, container: Container) -> Optional[CgroupCounters]:
+        service = container.service
+        if(not isinstance(service, LocalDocker)):
+            info(f'{container.name}: Only local containers can be sampled\n')
+            return None
+        try:
+            return CgroupCounters(service.docker.pid)
+        except Exception as ex:
+            info(f'{container.name}: Could not open cgroup counters ({ex})\n')
+            return None
+
+
+    def sample(self):
+        now = time.time()
+        counters = np.array([self._read(index) for index in range(len(self.counters))], dtype=np.float64)
+        counters = counters.reshape(len(self.containers), 4)
+        values   = np.empty((len(self.containers), len(FIELDS)), dtype=np.float64)
+
+        values[:, 0] = counters[:, 0]
+        values[:, 3] = counters[:, 1]
+        values[:, 4] = counters[:, 2]
+        values[:, 5] = counters[:, 3]
+        values[:, 2] = [self._cpu_limit(container) for container in self.containers]
+        values[:, 6] = [container.mem_limit for container in self.containers]
+
+        if(self._previous is None):
+            values[:, 1] = np.nan
+        else:
+            elapsed = now - self._previous_time
+            values[:, 1] = (counters[:, 0] - self._previous[:, 0]) / elapsed * 100
+
+        self._previous = counters
+        self._previous_time = now
+        self.buffer.append(now, values)
+
+    def _read(self, index: int) -> List[float]:
+        counters = self.counters[index]
+        if(counters is None):
+            return [np.nan] * 4
+        try:
+            return counters.read()
+        except (OSError, ValueError) as ex:
+            # The cgroup goes away with its container, e.g. after remove_docker
+            info(f'{self.containers[index].name}: Stopped sampling ({ex})\n')
+            counters.close()
+            self.counters[index] = None
+            return [np.nan] * 4
+
+    def _cpu_limit(self, container: Container) -> float:
+        if(container.cpu_quota <= 0 or container.cpu_period <= 0): return np.nan
+        return container.cpu_quota / container.cpu_period * 100
+
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name='fogbed-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_sample = time.monotonic()
+        while(not self._stop_event.is_set()):
+            self.sample()
+            next_sample += self.interval
+            self._stop_event.wait(max(0.0, next_sample - time.monotonic()))
+
+    def stop(self):
+        self._stop_event.set()
+        if(self._thread is not None):
+            self._thread.join()
+        for counters in self.counters:
+            if(counters is not None): counters.close()
+
+
+    def to_rows(self) -> Iterable[List]:
+        times = self.buffer.times()
+        data  = {field: self.buffer.values(field) for field in FIELDS}
+
+        for index, container in enumerate(self.containers):
+            for sample, timestamp in enumerate(times):
+                yield [timestamp, container.name, self.instances[index]] + [data[field][index, sample] for field in FIELDS]
+
+    def to_csv(self, path: str):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['time', 'container', 'instance'] + FIELDS)
+            writer.writerows(self.to_rows())
+
+    def to_parquet(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('Exporting to Parquet requires pyarrow: pip install pyarrow')
+
+        columns = list(zip(*self.to_rows())) or [[] for _ in range(len(FIELDS) + 3)]
+        names = ['time', 'container', 'instance'] + FIELDS
+        pq.write_table(pa.table(dict(zip(names, columns))), path)
+
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Usage versus assigned limits for each VirtualInstance."""
+        if(len(self.buffer) == 0): return {}
+
+        cpu      = self.buffer.values('cpu_percent')
+        limit    = self.buffer.values('cpu_limit_percent')
+        memory   = self.buffer.values('memory_usage')
+        throttle = self.buffer.values('throttled_periods')
+
+        groups: Dict[str, List[int]] = {}
+        for index, label in enumerate(self.instances):
+            groups.setdefault(label, []).append(index)
+
+        result: Dict[str, Dict[str, float]] = {}
+        for label, indexes in groups.items():
+            # The first sample has no previous one to compute a cpu rate from
+            instance_cpu    = np.nansum(cpu[indexes], axis=0)[1:]
+            instance_memory = np.nansum(memory[indexes], axis=0)
+
+            result[label] = {
+                'containers':         len(indexes),
+                'cpu_percent_mean':   float(instance_cpu.mean()) if(instance_cpu.size) else 0.0,
+                'cpu_percent_max':    float(instance_cpu.max()) if(instance_cpu.size) else 0.0,
+                'cpu_limit_percent':  float(np.nansum(limit[indexes, -1])),
+                'memory_bytes_mean':  float(instance_memory.mean()),
+                'memory_bytes_max':   float(instance_memory.max()),
+                'memory_limit_bytes': float(sum(max(self.containers[i].mem_limit, 0) for i in indexes)),
+                # Containers removed while sampling have NaN from then on
+                'throttled_periods':  float(np.nansum(np.fmax.reduce(throttle[indexes], axis=1) - np.fmin.reduce(throttle[indexes], axis=1))),
+            }
+        return result
@@ -1,12 +1,18 @@
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+from mininet.log import info
 from mininet.net import Containernet
-from mininet.node import Docker
+from mininet.node import Controller, Docker, Node
 from mininet.link import TCLink
+from mininet.topo import Topo
+from mininet.util import ipAdd, macColonHex
 
 from fogbed.node.instance import VirtualInstance
+from fogbed.tracing import tracer
 
 class Fogbed(Containernet):
-    def __init__(self, **params):
+    def __init__(self, max_workers: int = 1, **params):
+        self.max_workers = max_workers
         super().__init__(link=TCLink, **params)
         self.is_running = False
     
@@ -29,6 +35,103 @@ class Fogbed(Containernet):
 
         super().removeLink(node1=node1, node2=node2, **params)
 
+    def build(self):
+        with tracer.span('build'):
+            super().build()
+
+    def buildFromTopo(self, topo: Topo):
+        if(self.max_workers <= 1):
+            with tracer.span('build_topology'):
+                return super().buildFromTopo(topo)
+
+        info('*** Creating network\n')
+        if(not self.controllers and self.controller):
+            info('*** Adding controller\n')
+            classes = self.controller if(isinstance(self.controller, list)) else [self.controller]
+
+            for index, cls in enumerate(classes):
+                if(isinstance(cls, Controller)): self.addController(cls)
+                else: self.addController(f'c{index}', cls)
+
+        info(f'*** Adding hosts ({self.max_workers} workers):\n')
+        with tracer.span('add_hosts', hosts=len(topo.hosts())):
+            self._add_hosts_concurrently(topo)
+
+        # Switch ports are numbered as links are created, so both stay ordered
+        info('\n*** Adding switches:\n')
+        with tracer.span('add_switches'):
+            for name in topo.switches():
+                params = topo.nodeInfo(name)
+                cls = params.get('cls', self.switch)
+                if(hasattr(cls, 'batchStartup')): params.setdefault('batch', True)
+                self.addSwitch(name, **params)
+                info(name + ' ')
+
+        info('\n*** Adding links:\n')
+        with tracer.span('add_links'):
+            for node1, node2, params in topo.links(sort=True, withInfo=True):
+                self.addLink(**params)
+                info(f'({node1}, {node2}) ')
+        info('\n')
+
+
+    def configHosts(self):
+        if(self.max_workers <= 1):
+            with tracer.span('config_hosts'):
+                return super().configHosts()
+
+        with tracer.span('config_hosts'), ThreadPoolExecutor(self.max_workers) as pool:
+            for host in pool.map(self._config_host, self.hosts):
+                info(host.name + ' ')
+        info('\n')
+
+
+    def _add_hosts_concurrently(self, topo: Topo):
+        requests = [self._get_host_params(name, topo.nodeInfo(name)) for name in topo.hosts()]
+        errors: List[Exception] = []
+
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            futures = [pool.submit(cls, name, **params) for name, cls, params in requests]
+
+            for future in futures:
+                try:
+                    host = future.result()
+                except Exception as ex:
+                    errors.append(ex)
+                else:
+                    self.hosts.append(host)
+                    self.nameToNode[host.name] = host
+                    info(host.name + ' ')
+
+        if(errors):
+            raise errors[0]
+
+
+    def _get_host_params(self, name: str, params: Dict[str, Any]) -> Tuple[str, Any, Dict[str, Any]]:
+        # Same defaults as Mininet.addHost, assigned in topology order
+        defaults: Dict[str, Any] = {
+            'ip': ipAdd(self.nextIP, ipBaseNum=self.ipBaseNum, prefixLen=self.prefixLen) + f'/{self.prefixLen}'
+        }
+        if(self.autoSetMacs):
+            defaults['mac'] = macColonHex(self.nextIP)
+        if(self.autoPinCpus):
+            defaults['cores'] = self.nextCore
+            self.nextCore = (self.nextCore + 1) % self.numCores
+        self.nextIP += 1
+
+        defaults.update(params)
+        cls = defaults.pop('cls', None) or self.host
+        return name, cls, defaults
+
+
+    def _config_host(self, host: Node) -> Node:
+        if(host.defaultIntf()):
+            host.configDefault()
+        else:
+            host.configDefault(ip=None, mac=None)
+        return host
+
+
     def getDocker(self, name: str) -> Docker:
         container_names = [docker.name for docker in self.hosts]
         if(not name in container_names):
@@ -38,7 +141,11 @@ class Fogbed(Containernet):
 
     def start(self):
         self.is_running = True
-        super().start()
+        if(not self.built):
+            self.build()
+
+        with tracer.span('start_controllers_and_switches'):
+            super().start()
 
     def stop(self):
         self.is_running = False
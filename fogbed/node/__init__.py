@@ -1,3 +1,4 @@
 from fogbed.node.container import Container
+from fogbed.node.host import LightweightHost
 from fogbed.node.instance import VirtualInstance
 from fogbed.node.worker import Worker
\ No newline at end of file
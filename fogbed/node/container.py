@@ -1,10 +1,29 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock, get_ident
+from typing import Any, Dict, Iterator, List, Optional
 
+from fogbed.node.probes import Probe, wait_ready
+from fogbed.node.process import ManagedProcess
 from fogbed.node.services import DockerService
 from fogbed.resources.flavors import HardwareResources, Resources
+from fogbed.tracing import tracer
 
 from mininet.util import ipAdd
 
+MAX_COMMAND_WORKERS = 64
+
+executor: Optional[ThreadPoolExecutor] = None
+executor_lock = Lock()
+
+def get_command_executor() -> ThreadPoolExecutor:
+    global executor
+    with executor_lock:
+        if(executor is None):
+            executor = ThreadPoolExecutor(MAX_COMMAND_WORKERS, thread_name_prefix='fogbed-cmd')
+        return executor
+
+
 class Container:
     IP_COUNTER = 0
 
@@ -27,36 +46,114 @@ class Container:
         self.resources  = resources
         self._params    = params
         self._service: Optional[DockerService] = None
+        self._command_lock = Lock()
+        self._streaming: Optional[int] = None
+        self.probes: List[Probe] = []
+        self.processes: Dict[str, ManagedProcess] = {}
     
 
     def cmd(self, command: str) -> str:
         if(self._service is None):
             raise Exception(f'Docker container {self.name} was not started')
-        return self._service.run_command(command)
+        self._verify_not_streaming()
+
+        # The shell of a container runs a single command at a time
+        with self._command_lock, tracer.span('run_command', 'docker', container=self.name):
+            return self._service.run_command(command)
+
+    def stream(self, command: str) -> Iterator[str]:
+        """Yields the output of command in chunks as it is consumed. Other
+        commands run between chunks, except on local containers, whose shell
+        is busy until the stream is consumed or closed (e.g. with
+        contextlib.closing)."""
+        if(self._service is None):
+            raise Exception(f'Docker container {self.name} was not started')
+        self._verify_not_streaming()
+
+        with tracer.span('stream_command', 'docker', container=self.name):
+            if(self._service.exclusive_stream):
+                with self._command_lock:
+                    self._streaming = get_ident()
+                    try:
+                        yield from self._service.stream_command(command)
+                    finally:
+                        self._streaming = None
+                return
+
+            # Every chunk is a request of its own, so the lock is only held to read one
+            chunks = self._service.stream_command(command)
+            try:
+                while True:
+                    with self._command_lock:
+                        chunk = next(chunks, None)
+                    if(chunk is None): return
+                    yield chunk
+            finally:
+                with self._command_lock:
+                    chunks.close()
+
+    def _verify_not_streaming(self):
+        # The thread holding the shell would wait for itself
+        if(self._streaming == get_ident()):
+            raise Exception(f'{self.name}: close the stream before running other commands')
+
+    def cmd_async(self, command: str) -> 'Future[str]':
+        return get_command_executor().submit(self.cmd, command)
+
+    async def acmd(self, command: str) -> str:
+        return await asyncio.wrap_future(self.cmd_async(command))
 
     def start(self):
         if(self._service is None):
             raise Exception(f'Docker container {self.name} was not started')
-        self._service.start()
+        with tracer.span('start', 'docker', container=self.name):
+            self._service.start()
 
     def stop(self):
         if(self._service is None):
             raise Exception(f'Docker container {self.name} was not started')
-        self._service.stop()
+        with tracer.span('stop', 'docker', container=self.name):
+            self._service.stop()
+
+    def start_process(self, name: str, command: str) -> ManagedProcess:
+        if(not name.replace('-', '').replace('_', '').isalnum()):
+            raise Exception(f'Invalid process name {name}')
+        if(name in self.processes and self.processes[name].is_running()):
+            raise Exception(f'Process {name} is already running on {self.name}')
+
+        process = ManagedProcess(self, name, command)
+        self.processes[name] = process
+        return process.start()
+
+    def get_process(self, name: str) -> ManagedProcess:
+        if(not name in self.processes):
+            raise Exception(f'Process {name} not found on {self.name}')
+        return self.processes[name]
+
+    def add_probe(self, probe: Probe):
+        self.probes.append(probe)
+
+    def is_ready(self) -> bool:
+        return all(probe.check(self) for probe in self.probes)
+
+    def wait_ready(self, timeout: float) -> float:
+        return wait_ready([self], timeout)[self.name]
 
     def set_docker(self, service: DockerService):
         self._service = service
 
     def update_cpu(self, cpu_quota: int, cpu_period: int):
         if(self._service is not None):
-            self._service.update_cpu(cpu_quota, cpu_period)
+            with tracer.span('update_cpu', 'docker', container=self.name):
+                self._service.update_cpu(cpu_quota, cpu_period)
 
         self._params['cpu_quota'] = cpu_quota
         self._params['cpu_period'] = cpu_period
 
     def update_memory(self, memory_limit: int):
         if(self._service is not None):
-            self._service.update_memory(memory_limit)
+            with tracer.span('update_memory', 'docker', container=self.name):
+                self._service.update_memory(memory_limit)
 
         self._params['mem_limit'] = memory_limit
 
@@ -67,6 +164,10 @@ class Container:
         
         return ip
 
+    @property
+    def service(self) -> Optional[DockerService]:
+        return self._service
+
     @property
     def cpu_period(self) -> int:
         cpu_period = self._params.get('cpu_period')
@@ -82,6 +183,10 @@ class Container:
         mem_limit = self._params.get('mem_limit')
         return -1 if(mem_limit is None) else mem_limit
     
+    @property
+    def addresses(self) -> List[str]:
+        return [self.ip]
+
     @property
     def compute_units(self) -> float:
         return self.resources.compute_units
@@ -0,0 +1,29 @@
+from typing import Any, Dict, Optional
+
+from fogbed.node.container import Container
+from fogbed.resources.flavors import HardwareResources, Resources
+
+
+class LightweightHost(Container):
+    """Endpoint emulated by a shell in its own network namespace instead of a
+    Docker container. It shares the filesystem of the machine, so thousands
+    of them fit where only hundreds of containers would, and its limits are
+    applied through a cgroup created for it.
+    """
+
+    def __init__(self,
+        name: str,
+        ip: Optional[str] = None,
+        environment: Dict[str, str] = {},
+        resources: HardwareResources = Resources.TINY,
+        **params: Any
+    ):
+        super().__init__(name, ip=ip, environment=environment, resources=resources, **params)
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        self._params['ip'] = self.ip
+        return self._params
+
+    def __repr__(self) -> str:
+        return f'LightweightHost(name={self.name}, cpu_quota={self.cpu_quota}, cpu_period={self.cpu_period})'
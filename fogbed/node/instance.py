@@ -1,5 +1,6 @@
+from contextlib import nullcontext
 from itertools import chain
-from typing import Dict, Optional
+from typing import ContextManager, Dict, Optional
 
 from fogbed.exceptions import ContainerNotFound
 from fogbed.node.container import Container
@@ -27,7 +28,17 @@ class VirtualInstance(object):
             self.resource_model.allocate(container)
         self.containers[container.name] = container
 
+        services = self._get_services()
+        if(services is not None):
+            services.add_container(container, self)
+
     
+    def batch(self) -> ContextManager:
+        if(self.resource_model is None):
+            return nullcontext()
+        return self.resource_model.batch()
+
+
     def _create_switch(self) -> str:
         VirtualInstance.COUNTER += 1
         return f's{VirtualInstance.COUNTER}'
@@ -35,12 +46,22 @@ class VirtualInstance(object):
 
     def remove_container(self, name: str):
         if(not name in self.containers):
-            ContainerNotFound(f'Container {name} not found.')
+            raise ContainerNotFound(f'Container {name} not found.')
         
         container = self.containers[name]
         if(self.resource_model is not None):
             self.resource_model.free(container)
         self.containers.pop(name)
+
+        services = self._get_services()
+        if(services is not None):
+            services.remove_container(name)
+
+    def _get_services(self):
+        # Only registered instances are indexed; Services adds the containers
+        # an instance already has when it is registered
+        from fogbed.emulation import Services
+        return Services if(Services.virtual_instances().get(self.label) is self) else None
     
     def get_ip(self) -> str:
         return self._ip
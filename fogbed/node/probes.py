@@ -0,0 +1,161 @@
+import heapq
+import socket
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import count
+from shlex import quote
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.request import urlopen
+
+from fogbed.exceptions import ContainerNotReady
+
+if TYPE_CHECKING:
+    from fogbed.node.container import Container
+
+MAX_PROBE_WORKERS = 128
+
+
+class Probe(ABC):
+    @abstractmethod
+    def check(self, container: 'Container') -> bool:
+        pass
+
+
+class HttpProbe(Probe):
+    """Requests `url` from the experiment host, e.g. through a port binding."""
+
+    def __init__(self, url: str, status: int = 200, contains: Optional[str] = None, timeout: float = 2.0) -> None:
+        self.url      = url
+        self.status   = status
+        self.contains = contains
+        self.timeout  = timeout
+
+    def check(self, container: 'Container') -> bool:
+        try:
+            with urlopen(self.url, timeout=self.timeout) as response:
+                if(response.status != self.status): return False
+                if(self.contains is None): return True
+                return self.contains in response.read().decode(errors='replace')
+        except Exception:
+            return False
+
+
+class TcpProbe(Probe):
+    """Connects to `port` from inside the container, or from the experiment
+    host when `host` is given."""
+
+    def __init__(self, port: int, host: Optional[str] = None, timeout: float = 2.0) -> None:
+        self.port    = port
+        self.host    = host
+        self.timeout = timeout
+
+    def check(self, container: 'Container') -> bool:
+        if(self.host is not None):
+            try:
+                with socket.create_connection((self.host, self.port), timeout=self.timeout):
+                    return True
+            except OSError:
+                return False
+
+        command = f"bash -c 'exec 3<>/dev/tcp/127.0.0.1/{self.port}'"
+        return CommandProbe(command, self.timeout).check(container)
+
+
+class CommandProbe(Probe):
+    """Ready when `command` exits with status 0 inside the container within
+    `timeout` seconds."""
+
+    def __init__(self, command: str, timeout: float = 2.0) -> None:
+        self.command = command
+        self.timeout = timeout
+
+    def check(self, container: 'Container') -> bool:
+        output = container.cmd(f'timeout {self.timeout} sh -c {quote(self.command)} > /dev/null 2>&1; echo "exit=$?"')
+        return 'exit=0' in output
+
+
+class LogProbe(Probe):
+    """Ready when a line matching `pattern` shows up in the file `path`."""
+
+    def __init__(self, path: str, pattern: str, timeout: float = 2.0) -> None:
+        self.path    = path
+        self.pattern = pattern
+        self.timeout = timeout
+
+    def check(self, container: 'Container') -> bool:
+        return CommandProbe(f'grep -qE {quote(self.pattern)} {quote(self.path)}', self.timeout).check(container)
+
+
+class Backoff:
+    def __init__(self, initial: float = 0.1, factor: float = 2.0, maximum: float = 2.0) -> None:
+        self.initial = initial
+        self.factor  = factor
+        self.maximum = maximum
+
+    def delays(self) -> Iterable[float]:
+        delay = self.initial
+        while True:
+            yield delay
+            delay = min(delay * self.factor, self.maximum)
+
+
+def check_container(container: 'Container') -> bool:
+    try:
+        return container.is_ready()
+    except Exception:
+        return False
+
+
+def wait_ready(
+    containers: Iterable['Container'],
+    timeout: float,
+    backoff: Optional[Backoff] = None
+) -> Dict[str, float]:
+    """Waits for the probes of every container at the same time and returns
+    how long each one took to become ready.
+
+    The pool runs single checks rather than a loop per container, so every
+    container is checked from the start even when they outnumber the threads,
+    and a check still running at the deadline counts as not ready.
+    """
+    containers = list(containers)
+    backoff  = Backoff() if(backoff is None) else backoff
+    start    = time.monotonic()
+    deadline = start + timeout
+    results: Dict[str, float] = {}
+    if(not containers): return results
+
+    delays: Dict[str, Iterator[float]] = {container.name: iter(backoff.delays()) for container in containers}
+    counter = count()
+    # Containers waiting for their next check, by due time
+    scheduled: List[Tuple[float, int, 'Container']] = [(start, next(counter), container) for container in containers]
+    running: Dict[Future, 'Container'] = {}
+
+    pool = ThreadPoolExecutor(min(len(containers), MAX_PROBE_WORKERS), thread_name_prefix='fogbed-probe')
+    try:
+        while(scheduled or running):
+            now = time.monotonic()
+            if(now >= deadline): break
+            while(scheduled and scheduled[0][0] <= now):
+                container = heapq.heappop(scheduled)[2]
+                running[pool.submit(check_container, container)] = container
+
+            until = min(scheduled[0][0], deadline) if(scheduled) else deadline
+            done, _ = wait(list(running), timeout=max(until - now, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                container = running.pop(future)
+                if(future.result()):
+                    results[container.name] = time.monotonic() - start
+                else:
+                    due = time.monotonic() + next(delays[container.name])
+                    heapq.heappush(scheduled, (due, next(counter), container))
+    finally:
+        # Checks stuck past the deadline are left behind instead of waited for
+        for future in running: future.cancel()
+        pool.shutdown(wait=False)
+
+    pending = [container.name for container in containers if(not container.name in results)]
+    if(pending):
+        raise ContainerNotReady(pending, timeout)
+    return results
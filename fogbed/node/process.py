@@ -0,0 +1,128 @@
+import re
+import time
+from shlex import quote
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from fogbed.node.container import Container
+
+PROCESS_DIR = '/tmp/fogbed'
+
+
+class ManagedProcess:
+    """Long-running process started in background inside a container, with its
+    output and exit status kept in files under PROCESS_DIR.
+
+    Status checks only use shell builtins, so they run in the container's
+    existing shell without spawning new processes.
+    """
+
+    RUNNING = 'running'
+    EXITED  = 'exited'
+    STOPPED = 'stopped'
+    CREATED = 'created'
+
+    def __init__(self, container: 'Container', name: str, command: str) -> None:
+        self.container = container
+        self.name      = name
+        self.command   = command
+        self.pid: Optional[int] = None
+        self._exit_code: Optional[int] = None
+
+    @property
+    def stdout_path(self) -> str:
+        return f'{PROCESS_DIR}/{self.name}.out'
+
+    @property
+    def stderr_path(self) -> str:
+        return f'{PROCESS_DIR}/{self.name}.err'
+
+    @property
+    def exit_path(self) -> str:
+        return f'{PROCESS_DIR}/{self.name}.exit'
+
+    @property
+    def pid_path(self) -> str:
+        return f'{PROCESS_DIR}/{self.name}.pid'
+
+
+    def start(self) -> 'ManagedProcess':
+        if(self.is_running()):
+            raise Exception(f'Process {self.name} is already running on {self.container.name}')
+
+        # setsid puts the process in its own group, so stop() also reaches its children.
+        # With job control the background job already leads a group, so setsid forks
+        # and $! is a process that exited: the wrapper writes its own pid instead.
+        wrapper = f'echo $$ > {self.pid_path}; sh -c "$1"; echo $? > {self.exit_path}'
+        output = self.container.cmd(
+            f'mkdir -p {PROCESS_DIR}; rm -f {self.exit_path} {self.pid_path}; '
+            f'setsid sh -c {quote(wrapper)} fogbed {quote(self.command)} '
+            f'> {self.stdout_path} 2> {self.stderr_path} < /dev/null & '
+            f'n=0; while [ ! -s {self.pid_path} ] && [ $n -lt 500 ]; do n=$((n+1)); sleep 0.01; done; '
+            f'read -r pid < {self.pid_path} 2>/dev/null; echo "pid=$pid"'
+        )
+        match = re.search(r'pid=(\d+)', output)
+        if(match is None):
+            raise Exception(f'Could not start process {self.name} on {self.container.name}: {output}')
+
+        self.pid = int(match.group(1))
+        self._exit_code = None
+        return self
+
+
+    def status(self) -> str:
+        if(self.pid is None):
+            return ManagedProcess.CREATED
+
+        output = self.container.cmd(
+            f'if read -r _ _ state _ < /proc/{self.pid}/stat 2>/dev/null && [ "$state" != Z ]; '
+            f'then echo "status=running"; '
+            f'elif read code < {self.exit_path} 2>/dev/null; then echo "status=exited:$code"; '
+            f'else echo "status=stopped"; fi'
+        )
+        match = re.search(r'status=(\w+)(?::(-?\d+))?', output)
+        if(match is None):
+            raise Exception(f'Could not read the status of process {self.name}: {output}')
+
+        if(match.group(2) is not None):
+            self._exit_code = int(match.group(2))
+        return match.group(1)
+
+    def is_running(self) -> bool:
+        return self.status() == ManagedProcess.RUNNING
+
+    @property
+    def exit_code(self) -> Optional[int]:
+        if(self._exit_code is None and self.pid is not None):
+            self.status()
+        return self._exit_code
+
+
+    def stop(self, signal: str = 'TERM'):
+        if(self.pid is None): return
+        self.container.cmd(f'kill -{signal} -- -{self.pid} 2>/dev/null')
+
+    def restart(self, timeout: float = 10.0) -> 'ManagedProcess':
+        if(self.is_running()):
+            self.stop()
+            deadline = time.monotonic() + timeout
+
+            while(self.is_running()):
+                if(time.monotonic() > deadline): self.stop('KILL')
+                time.sleep(0.1)
+        return self.start()
+
+
+    def stdout(self, tail: Optional[int] = None) -> str:
+        return self._read(self.stdout_path, tail)
+
+    def stderr(self, tail: Optional[int] = None) -> str:
+        return self._read(self.stderr_path, tail)
+
+    def _read(self, path: str, tail: Optional[int]) -> str:
+        if(tail is None):
+            return self.container.cmd(f'cat {path} 2>/dev/null')
+        return self.container.cmd(f'tail -n {tail} {path} 2>/dev/null')
+
+    def __repr__(self) -> str:
+        return f'ManagedProcess(name={self.name}, container={self.container.name}, pid={self.pid})'
@@ -0,0 +1,242 @@
+import json
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fogbed.node.topology import apply_topology
+
+
+class StandInNode:
+    def __init__(self, name: str, **params: Any) -> None:
+        self.name     = name
+        self.params   = params
+        self.commands: List[str] = []
+        self.is_running = True
+
+    def cmd(self, command: str) -> str:
+        self.commands.append(command)
+        return ''
+
+    def IP(self) -> str:
+        return str(self.params.get('ip', ''))
+
+    def configDefault(self, **params: Any):
+        pass
+
+    def updateCpuLimit(self, cpu_quota: int = -1, cpu_period: int = -1, **params: Any):
+        self.params.update(cpu_quota=cpu_quota, cpu_period=cpu_period)
+
+    def updateMemoryLimit(self, mem_limit: int = -1, **params: Any):
+        self.params.update(mem_limit=mem_limit)
+
+    def start(self):
+        self.is_running = True
+
+    def stop(self):
+        self.is_running = False
+
+
+class StandInNet:
+    """In-memory replacement of a worker's Containernet that only records
+    the nodes and links it was asked to create."""
+
+    def __init__(self) -> None:
+        self.controllers: Dict[str, Any] = {}
+        self.nodes: Dict[str, StandInNode] = {}
+        self.links: List[Tuple[str, str, Dict[str, Any]]] = []
+        self.is_running = False
+
+    def addController(self, name: str, controller: Any = None, **params: Any):
+        self.controllers[name] = controller
+
+    def addSwitch(self, name: str, **params: Any):
+        self._add_node(name, **params)
+
+    def addDocker(self, name: str, **params: Any):
+        self._add_node(name, **params)
+
+    def addLink(self, node1: str, node2: str, **params: Any):
+        for node in (node1, node2):
+            if(not node in self.nodes):
+                raise Exception(f'Node {node} not found')
+        self.links.append((node1, node2, params))
+
+    def removeDocker(self, name: str):
+        self.nodes.pop(name, None)
+
+    def removeLink(self, node1: str, node2: str):
+        self.links = [link for link in self.links if({link[0], link[1]} != {node1, node2})]
+
+    def start(self):
+        self.is_running = True
+
+    def stop(self):
+        self.is_running = False
+
+    def _add_node(self, name: str, **params: Any):
+        if(name in self.nodes):
+            raise Exception(f'Node {name} already exists')
+        self.nodes[name] = StandInNode(name, **params)
+
+    def __getitem__(self, name: str) -> StandInNode:
+        if(not name in self.nodes):
+            raise Exception(f'Node {name} not found')
+        return self.nodes[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.nodes
+
+
+class WorkerServer:
+    """Serves `POST /topology` next to the routes of clusternet's server
+    used by RemoteWorker and RemoteDocker, all on the same worker network, so
+    it replaces that server on a worker (`Worker(ip, port=...)` reaches it).
+    With a `StandInNet` it can stand in for a real worker when no cluster is
+    available."""
+
+    def __init__(self, net: Optional[Any] = None, host: str = '127.0.0.1', port: int = 0) -> None:
+        self.net = StandInNet() if(net is None) else net
+        self.requests = 0
+        self.routes: List[Tuple[str, str, Callable[..., Tuple[int, Any]]]] = [
+            ('POST', r'/topology', self._create_topology),
+            ('POST', r'/controllers', self._add_controller),
+            ('POST', r'/switches', self._add_switch),
+            ('POST', r'/containers', self._add_docker),
+            ('DELETE', r'/containers/([^/]+)', self._remove_docker),
+            ('POST', r'/links', self._add_link),
+            ('POST', r'/links/remove', self._remove_link),
+            ('GET',  r'/hosts/([^/]+)/config', self._config_default),
+            ('GET',  r'/start', self._start_network),
+            ('GET',  r'/stop', self._stop_network),
+            ('POST', r'/hosts/([^/]+)/cmd', self._run_command),
+            ('GET',  r'/containers/([^/]+)/ip', self._get_ip),
+            ('PUT',  r'/containers/([^/]+)/cpu', self._update_cpu),
+            ('PUT',  r'/containers/([^/]+)/memory', self._update_memory),
+            ('GET',  r'/containers/([^/]+)/start', self._start_docker),
+            ('GET',  r'/containers/([^/]+)/stop', self._stop_docker),
+        ]
+        self._server = ThreadingHTTPServer((host, port), self._create_handler())
+        self._thread: Optional[Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _create_topology(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        apply_topology(self.net, body)
+        return 201, 'topology created'
+
+    def _add_controller(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        apply_topology(self.net, {'controller': body}, start=False)
+        return 201, f'controller {body["name"]} added'
+
+    def _add_switch(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        apply_topology(self.net, {'switches': [body['name']]}, start=False)
+        return 201, f'switch {body["name"]} added'
+
+    def _add_docker(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        apply_topology(self.net, {'containers': [body]}, start=False)
+        return 201, f'container {body["name"]} added'
+
+    def _remove_docker(self, body: Dict[str, Any], name: str) -> Tuple[int, Any]:
+        self.net.removeDocker(name)
+        return 200, f'container {name} removed'
+
+    def _add_link(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        apply_topology(self.net, {'links': [body]}, start=False)
+        return 201, f'link {body["node1"]} <-> {body["node2"]} added'
+
+    def _remove_link(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        self.net.removeLink(node1=body['node1'], node2=body['node2'])
+        return 200, f'link {body["node1"]} <-> {body["node2"]} removed'
+
+    def _config_default(self, body: Dict[str, Any], name: str) -> Tuple[int, Any]:
+        self.net[name].configDefault()
+        return 200, f'{name}: configured'
+
+    def _start_network(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        self.net.start()
+        return 200, 'network started'
+
+    def _stop_network(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        self.net.stop()
+        return 200, 'network stopped'
+
+    def _run_command(self, body: Dict[str, Any], name: str) -> Tuple[int, Any]:
+        return 200, self.net[name].cmd(str(body['command']))
+
+    def _get_ip(self, body: Dict[str, Any], name: str) -> Tuple[int, Any]:
+        return 200, self.net[name].IP()
+
+    def _update_cpu(self, body: Dict[str, Any], name: str) -> Tuple[int, Any]:
+        self.net[name].updateCpuLimit(cpu_quota=int(body['cpu_quota']), cpu_period=int(body['cpu_period']))
+        return 200, f'{name}: cpu updated'
+
+    def _update_memory(self, body: Dict[str, Any], name: str) -> Tuple[int, Any]:
+        self.net[name].updateMemoryLimit(mem_limit=int(body['mem_limit']))
+        return 200, f'{name}: memory updated'
+
+    def _start_docker(self, body: Dict[str, Any], name: str) -> Tuple[int, Any]:
+        self.net[name].start()
+        return 200, f'{name}: started'
+
+    def _stop_docker(self, body: Dict[str, Any], name: str) -> Tuple[int, Any]:
+        self.net[name].stop()
+        return 200, f'{name}: stopped'
+
+    def _create_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PUT(self):
+                self._dispatch('PUT')
+
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+
+            def _dispatch(self, method: str):
+                server.requests += 1
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length)) if(length) else {}
+
+                for route_method, pattern, handler in server.routes:
+                    match = re.fullmatch(pattern, self.path)
+                    if(route_method == method and match is not None):
+                        try:
+                            status, content = handler(body, *match.groups())
+                            return self._reply(status, {'content': content})
+                        except Exception as ex:
+                            return self._reply(500, {'error': f'{ex}'})
+                self._reply(404, {'error': f'Route {method} {self.path} not found'})
+
+            def _reply(self, status: int, body: Dict[str, Any]):
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format: str, *args: Any):
+                pass
+
+        return Handler
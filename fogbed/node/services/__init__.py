@@ -1,11 +1,18 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 
 class DockerService(ABC):
+    # Whether the shell stays busy until a stream_command is consumed or closed
+    exclusive_stream = False
+
     @abstractmethod
     def run_command(self, command: str) -> str:
         pass
     
+    def stream_command(self, command: str) -> Iterator[str]:
+        yield self.run_command(command)
+    
     @abstractmethod
     def get_ip(self) -> str:
         pass
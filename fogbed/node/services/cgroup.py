@@ -0,0 +1,112 @@
+import os
+from typing import Dict, List
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+CGROUP_PARENT = 'fogbed'
+
+
+def is_unified_hierarchy(root: str = CGROUP_ROOT) -> bool:
+    return os.path.exists(os.path.join(root, 'cgroup.controllers'))
+
+
+def get_cgroup_paths(pid: int, root: str = CGROUP_ROOT) -> Dict[str, str]:
+    unified = is_unified_hierarchy(root)
+    paths: Dict[str, str] = {}
+
+    # Each line has the format hierarchy-ID:controller-list:cgroup-path
+    with open(f'/proc/{pid}/cgroup') as file:
+        for line in file:
+            _, controllers, path = line.strip().split(':', 2)
+            path = path.lstrip('/')
+
+            if(unified and controllers == ''):
+                paths['cpu']     = os.path.join(root, path)
+                paths['cpuacct'] = os.path.join(root, path)
+                paths['memory']  = os.path.join(root, path)
+            elif(not unified):
+                for controller in controllers.split(','):
+                    if(controller in ('cpu', 'cpuacct', 'memory', 'freezer')):
+                        paths[controller] = os.path.join(root, controllers, path)
+
+    if(not 'cpu' in paths or not 'memory' in paths):
+        raise Exception(f'Could not find the cgroup of process {pid}')
+    return paths
+
+
+def _get_group_dirs(name: str, root: str) -> List[str]:
+    if(is_unified_hierarchy(root)):
+        return [os.path.join(root, CGROUP_PARENT, name)]
+    return [os.path.join(root, controller, CGROUP_PARENT, name) for controller in ('cpu', 'memory', 'freezer')
+            if(os.path.isdir(os.path.join(root, controller)))]
+
+
+def create_cgroup(name: str, pid: int, root: str = CGROUP_ROOT):
+    """Creates the cgroup fogbed/<name> and moves the process into it."""
+    if(is_unified_hierarchy(root)):
+        # Controllers must be enabled in the parent before a child can use them
+        os.makedirs(os.path.join(root, CGROUP_PARENT), exist_ok=True)
+        with open(os.path.join(root, CGROUP_PARENT, 'cgroup.subtree_control'), 'w') as file:
+            file.write('+cpu +memory')
+
+    for group in _get_group_dirs(name, root):
+        os.makedirs(group, exist_ok=True)
+        with open(os.path.join(group, 'cgroup.procs'), 'w') as file:
+            file.write(str(pid))
+
+
+def remove_cgroup(name: str, root: str = CGROUP_ROOT):
+    # A cgroup can only be removed once all of its processes have exited
+    for group in _get_group_dirs(name, root):
+        if(os.path.isdir(group)):
+            os.rmdir(group)
+
+
+class CgroupFS:
+    """Writes cpu and memory limits directly into the cgroup of a process,
+    using cpu.max/memory.max on cgroup v2 and the cfs/limit files on v1.
+    """
+    def __init__(self, pid: int, root: str = CGROUP_ROOT) -> None:
+        self.pid     = pid
+        self.unified = is_unified_hierarchy(root)
+        self.paths   = get_cgroup_paths(pid, root)
+
+
+    def update_cpu(self, cpu_quota: int, cpu_period: int):
+        if(self.unified):
+            quota = 'max' if(cpu_quota < 0) else str(cpu_quota)
+            self._write('cpu', 'cpu.max', f'{quota} {cpu_period}')
+        else:
+            self._write('cpu', 'cpu.cfs_period_us', str(cpu_period))
+            self._write('cpu', 'cpu.cfs_quota_us', str(cpu_quota))
+
+
+    def update_memory(self, memory_in_bytes: int):
+        if(self.unified):
+            limit = 'max' if(memory_in_bytes < 0) else str(memory_in_bytes)
+            self._write('memory', 'memory.max', limit)
+            return
+
+        try:
+            self._write('memory', 'memory.limit_in_bytes', str(memory_in_bytes))
+        except OSError:
+            # The memory+swap limit can not be lower than the memory limit
+            self._write('memory', 'memory.memsw.limit_in_bytes', str(memory_in_bytes))
+            self._write('memory', 'memory.limit_in_bytes', str(memory_in_bytes))
+
+
+    def freeze(self, frozen: bool):
+        if(self.unified):
+            self._write('cpu', 'cgroup.freeze', '1' if(frozen) else '0')
+        elif('freezer' in self.paths):
+            self._write('freezer', 'freezer.state', 'FROZEN' if(frozen) else 'THAWED')
+        else:
+            raise Exception(f'The freezer controller is not available for process {self.pid}')
+
+
+    def read(self, controller: str, filename: str) -> str:
+        with open(os.path.join(self.paths[controller], filename)) as file:
+            return file.read()
+
+    def _write(self, controller: str, filename: str, value: str):
+        with open(os.path.join(self.paths[controller], filename), 'w') as file:
+            file.write(value)
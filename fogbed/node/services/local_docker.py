@@ -1,23 +1,53 @@
+from typing import Iterator, Optional
 
 from fogbed.node.services import DockerService
+from fogbed.node.services.cgroup import CgroupFS
 
+from mininet.log import info
 from mininet.node import Docker
 
 class LocalDocker(DockerService):
-    def __init__(self, docker: Docker) -> None:
+    exclusive_stream = True
+
+    def __init__(self, docker: Docker, cgroup: bool = False) -> None:
         self.docker = docker
+        self.cgroup: Optional[CgroupFS] = None
+
+        if(cgroup):
+            try:
+                self.cgroup = CgroupFS(docker.pid)
+            except Exception as ex:
+                info(f'{docker.name}: Using the Docker API to update limits ({ex})\n')
     
     def get_ip(self) -> str:
         return self.docker.IP()
 
     def run_command(self, command: str) -> str:
         return self.docker.cmd(command)
+
+    def stream_command(self, command: str) -> Iterator[str]:
+        # Output is only read from the shell when the consumer asks for it
+        self.docker.sendCmd(command)
+        try:
+            while self.docker.waiting:
+                data = self.docker.monitor()
+                if(data): yield data
+        finally:
+            if(self.docker.waiting):
+                self.docker.sendInt()
+                self.docker.waitOutput()
     
     def update_cpu(self, cpu_quota: int, cpu_period: int):
-        self.docker.updateCpuLimit(cpu_quota, cpu_period)
+        if(self.cgroup is not None):
+            self.cgroup.update_cpu(cpu_quota, cpu_period)
+        else:
+            self.docker.updateCpuLimit(cpu_quota, cpu_period)
     
     def update_memory(self, memory_in_bytes: int):
-        self.docker.updateMemoryLimit(memory_in_bytes)
+        if(self.cgroup is not None):
+            self.cgroup.update_memory(memory_in_bytes)
+        else:
+            self.docker.updateMemoryLimit(memory_in_bytes)
     
     def start(self):
         return self.docker.start()
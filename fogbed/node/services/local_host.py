@@ -0,0 +1,34 @@
+from fogbed.node.services.cgroup import CgroupFS, create_cgroup, remove_cgroup
+from fogbed.node.services.local_docker import LocalDocker
+
+from mininet.log import info
+from mininet.node import Host
+
+
+class LocalHost(LocalDocker):
+    """Service of a LightweightHost: its shell is moved into a cgroup of its
+    own, where the limits are written and start/stop thaw/freeze it."""
+
+    def __init__(self, host: Host) -> None:
+        self.docker = host
+        create_cgroup(host.name, host.pid)
+        self.cgroup = CgroupFS(host.pid)
+
+    def update_cpu(self, cpu_quota: int, cpu_period: int):
+        self.cgroup.update_cpu(cpu_quota, cpu_period)
+
+    def update_memory(self, memory_in_bytes: int):
+        self.cgroup.update_memory(memory_in_bytes)
+
+    def start(self):
+        self.cgroup.freeze(False)
+
+    def stop(self):
+        self.cgroup.freeze(True)
+
+    def close(self):
+        # The shell may still be exiting when the network stops
+        try:
+            remove_cgroup(self.docker.name)
+        except OSError as ex:
+            info(f'{self.docker.name}: Could not remove the cgroup ({ex})\n')
@@ -1,25 +1,88 @@
+import base64
+import codecs
+import time
+import uuid
+from typing import Iterator
 
 from fogbed.node.services import DockerService
+from fogbed.node.services.session import get_session
 from clusternet.client.container import RemoteContainer
 
+STREAM_CHUNK_SIZE = 65536
+STREAM_MAX_INTERVAL = 0.5
+
 class RemoteDocker(DockerService):
-    def __init__(self, name: str, url: str) -> None:
-        self.docker = RemoteContainer(name, url)
+    def __init__(self, name: str, url: str, pooled: bool = True) -> None:
+        self.name    = name
+        self.docker  = RemoteContainer(name, url)
+        self.session = get_session(url) if(pooled) else None
 
     def get_ip(self) -> str:
-        return self.docker.get_ip()
-    
+        if(self.session is None):
+            return self.docker.get_ip()
+        return self.session.get(f'/containers/{self.name}/ip')
+
     def run_command(self, command: str) -> str:
-        return self.docker.cmd(command)
-    
+        if(self.session is None):
+            return self.docker.cmd(command)
+        return self.session.post(f'/hosts/{self.name}/cmd', {'command': command})
+
+    def stream_command(self, command: str) -> Iterator[str]:
+        # The command runs in background writing to a file on the worker,
+        # which is read one chunk at a time as the consumer iterates.
+        path   = f'/tmp/fogbed-stream-{uuid.uuid4().hex}'
+        quoted = command.replace("'", "'\\''")
+        self.run_command(
+            f"(setsid sh -c '{quoted}' > {path}.out 2>&1 & echo $! > {path}.pid; "
+            f"wait $!; echo $? > {path}.exit) > /dev/null 2>&1 &"
+        )
+
+        decoder  = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        offset   = 0
+        interval = 0.01
+        finished = False
+        try:
+            while(not finished):
+                # The exit code is read first: once it exists, the output is complete
+                output = self.run_command(
+                    f'printf "%s|%s" "$(cat {path}.exit 2>/dev/null)" '
+                    f'"$(tail -c +{offset + 1} {path}.out | head -c {STREAM_CHUNK_SIZE} | base64 -w0)"'
+                )
+                exit_code, _, encoded = output.strip().partition('|')
+                chunk = base64.b64decode(encoded)
+                offset += len(chunk)
+                finished = bool(exit_code) and len(chunk) < STREAM_CHUNK_SIZE
+
+                if(chunk):
+                    interval = 0.01
+                    yield decoder.decode(chunk, final=finished)
+                elif(finished):
+                    tail = decoder.decode(b'', final=True)
+                    if(tail): yield tail
+                else:
+                    time.sleep(interval)
+                    interval = min(interval * 2, STREAM_MAX_INTERVAL)
+        finally:
+            if(not finished): self.run_command(f'kill -- -$(cat {path}.pid) 2>/dev/null')
+            self.run_command(f'rm -f {path}.out {path}.pid {path}.exit')
+
     def update_cpu(self, cpu_quota: int, cpu_period: int):
-        self.docker.update_cpu(cpu_quota, cpu_period)
-    
+        if(self.session is None):
+            return self.docker.update_cpu(cpu_quota, cpu_period)
+        data = {'cpu_quota': cpu_quota, 'cpu_period': cpu_period}
+        self.session.put(f'/containers/{self.name}/cpu', data)
+
     def update_memory(self, memory_in_bytes: int):
-        self.docker.update_memory(memory_in_bytes)
-    
+        if(self.session is None):
+            return self.docker.update_memory(memory_in_bytes)
+        self.session.put(f'/containers/{self.name}/memory', {'mem_limit': memory_in_bytes})
+
     def start(self):
-        self.docker.start()
-    
+        if(self.session is None):
+            return self.docker.start()
+        self.session.get(f'/containers/{self.name}/start')
+
     def stop(self):
-        self.docker.stop()
\ No newline at end of file
+        if(self.session is None):
+            return self.docker.stop()
+        self.session.get(f'/containers/{self.name}/stop')
\ No newline at end of file
@@ -0,0 +1,55 @@
+from threading import Lock
+from typing import Any, Dict
+
+import httpx
+
+MAX_CONNECTIONS = 16
+
+sessions: Dict[str, 'WorkerSession'] = {}
+sessions_lock = Lock()
+
+
+class WorkerSession:
+    """Keep-alive connection pool shared by every RemoteDocker of a worker."""
+
+    def __init__(self, url: str, max_connections: int = MAX_CONNECTIONS) -> None:
+        self.url = url
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self.client = httpx.Client(base_url=url, limits=limits, timeout=None)
+
+
+    def request(self, method: str, path: str, **params: Any) -> Any:
+        response = self.client.request(method, path, **params)
+
+        if(response.is_error):
+            raise Exception(response.json()['error'])
+        return response.json()['content']
+
+    def get(self, path: str) -> Any:
+        return self.request('GET', path)
+
+    def post(self, path: str, data: Dict[str, Any]) -> Any:
+        return self.request('POST', path, json=data)
+
+    def put(self, path: str, data: Dict[str, Any]) -> Any:
+        return self.request('PUT', path, json=data)
+
+    def close(self):
+        self.client.close()
+
+
+def get_session(url: str) -> WorkerSession:
+    with sessions_lock:
+        if(not url in sessions):
+            sessions[url] = WorkerSession(url)
+        return sessions[url]
+
+
+def close_session(url: str):
+    with sessions_lock:
+        session = sessions.pop(url, None)
+    if(session is not None):
+        session.close()
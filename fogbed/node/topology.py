@@ -0,0 +1,94 @@
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+import httpx
+from mininet.link import TCLink
+from mininet.node import RemoteController
+
+
+class WorkerTopology:
+    """Everything a worker has to build, sent to it in a single request."""
+
+    def __init__(self) -> None:
+        self.controller: Optional[Dict[str, Any]] = None
+        self.switches: List[str] = []
+        self.containers: List[Dict[str, Any]] = []
+        self.links: List[Dict[str, Any]] = []
+        self.gateway: Optional[str] = None
+        self.gateway_links: List[str] = []
+        self.tunnels: List[str] = []
+
+
+    def add_controller(self, name: str, ip: str, port: int):
+        self.controller = {'name': name, 'ip': ip, 'port': port}
+
+    def add_switch(self, name: str):
+        self.switches.append(name)
+
+    def add_docker(self, name: str, **params: Any):
+        self.containers.append({'name': name, **params})
+
+    def add_link(self, node1: str, node2: str, **params: Any):
+        self.links.append({'node1': node1, 'node2': node2, **params})
+
+    def add_gateway(self, name: str, reachable_switches: List[str]):
+        self.gateway = name
+        self.gateway_links = reachable_switches
+
+    def add_tunnel(self, command: str):
+        self.tunnels.append(command)
+
+    @property
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'controller': self.controller,
+            'switches': self.switches,
+            'containers': self.containers,
+            'links': self.links,
+            'gateway': self.gateway,
+            'gateway_links': self.gateway_links,
+            'tunnels': self.tunnels
+        }
+
+
+def submit_topology(url: str, topology: WorkerTopology) -> bool:
+    """False when the worker has no /topology route, like clusternet's
+    server, so nothing was created and the topology must be built call by call."""
+    response = httpx.post(url=f'{url}/topology', json=topology.to_dict, timeout=None)
+
+    if(response.status_code == 404):
+        return False
+    if(response.is_error):
+        raise Exception(response.json()['error'])
+    return True
+
+
+def apply_topology(net: Any, topology: Dict[str, Any], start: bool = True):
+    """Builds and starts a topology described by `WorkerTopology.to_dict`
+    on the worker side, where `net` is the worker's Containernet.
+    """
+    controller = topology.get('controller')
+    if(controller is not None):
+        remote = partial(RemoteController, ip=controller['ip'], port=int(controller['port']))
+        net.addController(controller['name'], remote)
+
+    for switch in topology.get('switches', []):
+        net.addSwitch(switch)
+
+    for params in topology.get('containers', []):
+        net.addDocker(**params)
+
+    for params in topology.get('links', []):
+        net.addLink(**params, cls=TCLink)
+
+    gateway = topology.get('gateway')
+    if(gateway is not None):
+        net.addSwitch(gateway)
+        for switch in topology.get('gateway_links', []):
+            net.addLink(switch, gateway, cls=TCLink)
+
+    if(not start): return
+    net.start()
+
+    for command in topology.get('tunnels', []):
+        net[gateway].cmd(command)
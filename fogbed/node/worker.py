@@ -1,23 +1,58 @@
-from typing import Any, Dict, List
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from clusternet.client.worker import RemoteWorker
-from fogbed.exceptions import VirtualInstanceAlreadyExists, VirtualInstanceNotFound
-from fogbed.experiment.link import Link
+from fogbed.exceptions import LinkNotFound, LinkUpdateFailed, VirtualInstanceAlreadyExists, VirtualInstanceNotFound
+from fogbed.experiment.link import (
+    Link,
+    LinkUpdate,
+    get_batch_command,
+    get_batch_error,
+    get_shaping,
+    get_shaping_commands,
+    merge_shaping,
+    set_shaping
+)
 from fogbed.node.instance import VirtualInstance
 from fogbed.node.services.remote_docker import RemoteDocker
+from fogbed.node.services.session import close_session, get_session
+from fogbed.node.topology import WorkerTopology, submit_topology
+from fogbed.tracing import tracer
 
+from mininet.log import info
+
+
+TUNNEL_TYPES = ('gre', 'vxlan')
+
+# Outer IPv4 header plus the encapsulated Ethernet header, and GRE or UDP+VXLAN
+TUNNEL_OVERHEAD = {'gre': 20 + 4 + 14, 'vxlan': 20 + 8 + 8 + 14}
+
+
+def get_tunnel_command(port: str, interface: str, ip: str, kind: str = 'gre', key: Optional[int] = None) -> str:
+    options = f'options:remote_ip={ip}' + ('' if(key is None) else f' options:key={key}')
+    return f'ovs-vsctl add-port {port} {port}-{interface} -- set interface {port}-{interface} type={kind} {options}'
+
+
+def get_tunnel_mtu(kind: str = 'gre', key: Optional[int] = None, underlay_mtu: int = 1500) -> int:
+    overhead = TUNNEL_OVERHEAD[kind] + (4 if(kind == 'gre' and key is not None) else 0)
+    return underlay_mtu - overhead
+
+
+def get_mtu_command(mtu: int) -> str:
+    return f'for intf in $(ls /sys/class/net | grep -- -eth); do ip link set dev $intf mtu {mtu}; done'
 
-def get_tunnel_command(port: str, interface: str, ip: str) -> str:
-    return f'ovs-vsctl add-port {port} {port}-{interface} -- set interface {port}-{interface} type=gre options:remote_ip={ip}'
 
 class Worker:
-    def __init__(self, ip: str) -> None:
+    def __init__(self, ip: str, bulk: bool = False, port: int = 5000) -> None:
         # Validate IP
         self.ip = ip
+        self.bulk = bulk
         self.datacenters: Dict[str, VirtualInstance] = {}
         self.tunnels: List[str] = []
+        self.tunnel_params: Dict[str, Tuple[str, Optional[int]]] = {}
+        self.loop_protection = False
         self.links: List[Link] = []
-        self.net = RemoteWorker(ip)
+        self.net = RemoteWorker(ip, port)
         
 
     def add(self, datacenter: VirtualInstance, reachable: bool = False):
@@ -37,12 +72,107 @@ class Worker:
         self.links.append(Link(node1.switch, node2.switch, **params))
 
 
-    def add_tunnel(self, destination_ip: str):
+    def update_links(self, updates: Iterable[LinkUpdate]):
+        """Changes the shaping of links between instances of this worker in
+        place, with a single tc process on the worker; see
+        FogbedExperiment.update_links."""
+        changes: List[Tuple[Link, Dict[str, Any], Dict[str, Any]]] = []
+        # Shaping of each link after the changes so far, stored once tc applied them
+        staged: Dict[int, Dict[str, Any]] = {}
+        for node1, node2, params in updates:
+            links = [link for link in self.links if({link.node1, link.node2} == {node1.switch, node2.switch})]
+            if(not links):
+                raise LinkNotFound(node1.label, node2.label)
+            for link in links:
+                current = staged.get(id(link), get_shaping(link.params))
+                staged[id(link)] = merge_shaping(current, params)
+                changes.append((link, current, staged[id(link)]))
+
+        if(not self.is_running or not changes):
+            for link, _, new in changes: set_shaping(link.params, new)
+            return
+        interfaces = self._get_link_interfaces()
+        commands: List[str] = []
+
+        for link, current, new in changes:
+            # Parallel links between the same switches are matched in creation order
+            parallel = [other for other in self.links if({other.node1, other.node2} == {link.node1, link.node2})]
+            position = parallel.index(link)
+            candidates = interfaces.get((link.node1, link.node2), [])
+            if(position >= len(candidates)):
+                raise LinkNotFound(link.node1, link.node2)
+            for interface in candidates[position]:
+                commands += get_shaping_commands(interface, current, new)
+
+        if(commands):
+            with tracer.span('update_links', 'network', worker=self.ip, commands=len(commands)):
+                output = self._run_on_switch(get_batch_command(commands))
+            error = get_batch_error(output)
+            if(error is not None):
+                raise LinkUpdateFailed(f'{self.ip}: {error}')
+
+        # A failure above leaves the params as they were
+        for link, _, new in changes:
+            set_shaping(link.params, new)
+
+
+    def _get_link_interfaces(self) -> Dict[Tuple[str, str], List[Tuple[str, str]]]:
+        # Switches share the root namespace, so each veth shows its peer as name@peer
+        output = self._run_on_switch('ip -o link show')
+        interfaces: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        for name, peer in re.findall(r'^\d+: ([^@:\s]+)@([^:\s]+):', output, re.MULTILINE):
+            if(not '-eth' in peer): continue
+            pair = (name.split('-eth')[0], peer.split('-eth')[0])
+            interfaces.setdefault(pair, []).append((name, peer))
+
+        for pairs in interfaces.values():
+            pairs.sort(key=lambda pair: int(pair[0].split('-eth')[1]))
+        return interfaces
+
+    def _run_on_switch(self, command: str) -> str:
+        switch = next(iter(self.datacenters.values())).switch
+        return get_session(self.net.url).post(f'/hosts/{switch}/cmd', {'command': command})
+
+
+    def add_tunnel(self, destination_ip: str, kind: str = 'gre', key: Optional[int] = None):
         if(destination_ip == self.ip):
             raise Exception('Tunnel loops are not allowed')
         if(destination_ip in self.tunnels):
             raise Exception(f'Already exist a tunnel to worker with ip={destination_ip}')
+        if(not kind in TUNNEL_TYPES):
+            raise Exception(f'Unknown tunnel type {kind}, expected one of {TUNNEL_TYPES}')
         self.tunnels.append(destination_ip)
+        self.tunnel_params[destination_ip] = (kind, key)
+
+
+    def _get_tunnel_commands(self, gateway: str) -> List[str]:
+        commands: List[str] = []
+        for index, ip in enumerate(self.tunnels):
+            kind, key = self.tunnel_params.get(ip, ('gre', None))
+            commands.append(get_tunnel_command(gateway, f'{kind}{index+1}', ip, kind, key))
+
+        # A mesh of tunnels forms a loop between the gateways
+        if(self.loop_protection):
+            commands.append(f'ovs-vsctl set bridge {gateway} rstp_enable=true')
+        return commands
+
+
+    def configure_tunnel_path(self, mtu: int, offload: Optional[Dict[str, bool]] = None):
+        """Lowers the MTU of the containers so encapsulated frames are not
+        fragmented, and sets the offloads of the switch ports of this worker."""
+        gateway = self._get_valid_switchname()
+        futures = [
+            container.cmd_async(get_mtu_command(mtu))
+            for datacenter in self.datacenters.values() for container in datacenter
+        ]
+
+        if(offload):
+            features = ' '.join(f'{feature} {"on" if(enabled) else "off"}' for feature, enabled in offload.items())
+            get_session(self.net.url).post(f'/hosts/{gateway}/cmd', {
+                'command': f'for intf in $(ls /sys/class/net | grep -E "^s[0-9]+-eth"); do ethtool -K $intf {features} 2>/dev/null; done'
+            })
+        for future in futures:
+            future.result()
     
 
     def _create_topology(self):
@@ -59,9 +189,32 @@ class Worker:
             self.net.add_link(**link.to_dict)
 
 
+    def _describe_topology(self, controller_ip: str, controller_port: int) -> WorkerTopology:
+        topology = WorkerTopology()
+        topology.add_controller('c0', controller_ip, controller_port)
+
+        for datacenter in self.datacenters.values():
+            topology.add_switch(datacenter.switch)
+
+            for container in datacenter:
+                topology.add_docker(container.name, **container.params)
+                topology.add_link(container.name, datacenter.switch)
+
+        for link in self.links:
+            topology.add_link(**link.to_dict)
+
+        gateway = self._get_valid_switchname()
+        reachable = [dc.switch for dc in self.datacenters.values() if(dc.is_reachable)]
+        topology.add_gateway(gateway, reachable)
+
+        for command in self._get_tunnel_commands(gateway):
+            topology.add_tunnel(command)
+        return topology
+
+
     def _get_valid_switchname(self) -> str:
         switches = list(self.datacenters.keys())
-        switches.sort()
+        switches.sort(key=lambda switch: int(switch[1:]))
         last_switch_index = int(switches[-1][1:])
         return f's{last_switch_index + 1}'
     
@@ -75,8 +228,7 @@ class Worker:
     
 
     def _create_tunnels(self, gateway: str):
-        for index, ip in enumerate(self.tunnels):
-            command = get_tunnel_command(port=gateway, interface=f'gre{index+1}', ip=ip)
+        for command in self._get_tunnel_commands(gateway):
             self.net.run_command(gateway, command)
 
     @property
@@ -87,13 +239,37 @@ class Worker:
         if(not self.datacenters):
             raise Exception('Expect at least 1 VirtualInstance')
 
-        self.net.add_controller('c0', controller_ip, controller_port)
-        self._create_topology()
-        
-        gateway = self._get_valid_switchname()
-        self._create_links_to_gateway(gateway)
-        self.net.start()
-        self._create_tunnels(gateway)
+        with tracer.span('worker_start', worker=self.ip):
+            if(self.bulk and self._start_from_description(controller_ip, controller_port)):
+                return
+
+            with tracer.span('create_topology', worker=self.ip):
+                self.net.add_controller('c0', controller_ip, controller_port)
+                self._create_topology()
+
+                gateway = self._get_valid_switchname()
+                self._create_links_to_gateway(gateway)
+
+            with tracer.span('start_network', worker=self.ip):
+                self.net.start()
+
+            with tracer.span('create_tunnels', worker=self.ip, tunnels=len(self.tunnels)):
+                self._create_tunnels(gateway)
+    
+    def _start_from_description(self, controller_ip: str, controller_port: int) -> bool:
+        topology = self._describe_topology(controller_ip, controller_port)
+        with tracer.span('submit_topology', worker=self.ip):
+            if(not submit_topology(self.net.url, topology)):
+                info(f'*** {self.ip}: the worker cannot build a whole topology, creating it call by call\n')
+                return False
+        self.net.is_running = True
+
+        for datacenter in self.datacenters.values():
+            for container in datacenter:
+                container.set_docker(RemoteDocker(container.name, self.net.url))
+        return True
     
     def stop(self):
-        self.net.stop()
+        with tracer.span('worker_stop', worker=self.ip):
+            self.net.stop()
+        close_session(self.net.url)
@@ -12,6 +12,9 @@ class CPUAllocator:
         requested_cu = container.compute_units
         cpu_quota    = self.calculate_cpu_quota(requested_cu)
         cpu_period   = Services.cpu_period_in_microseconds()
+
+        if(container.cpu_quota == cpu_quota and container.cpu_period == cpu_period):
+            return
         container.update_cpu(cpu_quota, cpu_period)    
 
     def calculate_cpu_quota(self, requested_cu: float) -> int:
@@ -31,6 +34,9 @@ class MemoryAllocator:
     def allocate(self, container: Container):
         requested_mu = container.memory_units
         memory_limit = self.calculate_memory_limit(requested_mu)
+
+        if(container.mem_limit == memory_limit):
+            return
         container.update_memory(memory_limit)
 
     def calculate_memory_limit(self, requested_mu: int) -> int:
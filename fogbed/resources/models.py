@@ -3,6 +3,7 @@ from fogbed.exceptions import NotEnoughResourcesAvailable
 from fogbed.node.container import Container
 from fogbed.resources.protocols import ResourceModel
 from fogbed.resources.allocation import CPUAllocator, MemoryAllocator
+from fogbed.tracing import tracer
 
 
 class EdgeResourceModel(ResourceModel):
@@ -54,29 +55,40 @@ class EdgeResourceModel(ResourceModel):
 
 # ================================================================================== #
 class CloudResourceModel(EdgeResourceModel):
+    over_provisioning = True
+
     def __init__(self, max_cu=32, max_mu=1024) -> None:
         super().__init__(max_cu, max_mu)
         self.allocated_containers: list[Container] = []
+        self._pending_cpu_update    = False
+        self._pending_memory_update = False
 
     def allocate_cpu(self, container: Container):
         self.allocated_containers.append(container)
         self.allocated_cu += container.compute_units
-        self._update_cpu_for_all_containers()
+        self._request_cpu_update()
 
     def free_cpu(self, container: Container):
         super().free_cpu(container)
         self.allocated_containers.remove(container)
-        self._update_cpu_for_all_containers()
+        self._request_cpu_update()
 
 
     def allocate_memory(self, container: Container):
         self.allocated_mu += container.memory_units
-        self._update_memory_for_all_containers()
+        self._request_memory_update()
 
 
     def free_memory(self, container: Container):
         super().free_memory(container)
-        self._update_memory_for_all_containers()
+        self._request_memory_update()
+
+
+    def commit(self):
+        if(self._pending_cpu_update):
+            self._update_cpu_for_all_containers()
+        if(self._pending_memory_update):
+            self._update_memory_for_all_containers()
 
     
     def calculate_cpu_percentage(self) -> float:
@@ -95,13 +107,29 @@ class CloudResourceModel(EdgeResourceModel):
         return super().calculate_memory_percentage() * memory_factor
 
 
+    def _request_cpu_update(self):
+        if(self.in_batch):
+            self._pending_cpu_update = True
+        else:
+            self._update_cpu_for_all_containers()
+
+    def _request_memory_update(self):
+        if(self.in_batch):
+            self._pending_memory_update = True
+        else:
+            self._update_memory_for_all_containers()
+
     def _update_cpu_for_all_containers(self):
-        for container in self.allocated_containers:
-            self.cpu_allocator.allocate(container)
+        self._pending_cpu_update = False
+        with tracer.span('allocate_cpu', 'resources', containers=len(self.allocated_containers)):
+            for container in self.allocated_containers:
+                self.cpu_allocator.allocate(container)
     
     def _update_memory_for_all_containers(self):
-        for container in self.allocated_containers:
-            self.memory_allocator.allocate(container)
+        self._pending_memory_update = False
+        with tracer.span('allocate_memory', 'resources', containers=len(self.allocated_containers)):
+            for container in self.allocated_containers:
+                self.memory_allocator.allocate(container)
 
 
 class FogResourceModel(CloudResourceModel):
@@ -0,0 +1,179 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from fogbed.exceptions import PlacementFailed
+from fogbed.node.container import Container
+from fogbed.node.instance import VirtualInstance
+
+MODEL_TIERS = {
+    'EdgeResourceModel':  'edge',
+    'FogResourceModel':   'fog',
+    'CloudResourceModel': 'cloud',
+}
+
+Tier = Union[str, Sequence[str]]
+
+
+def get_tier(datacenter: VirtualInstance) -> Optional[str]:
+    model = datacenter.resource_model
+    return None if(model is None) else MODEL_TIERS.get(type(model).__name__)
+
+
+class Placement:
+    """Assigns containers to VirtualInstances by bin-packing their compute
+    and memory units, scoring every instance at once with NumPy.
+
+    Containers in the same affinity group are packed together as one item,
+    containers of an anti-affinity group never share an instance, and tiers
+    restrict a container to instances whose resource model is edge, fog or
+    cloud (or to the tiers given in instance_tiers).
+
+    Instances whose model over-provisions, as Fog and Cloud do, take
+    containers beyond their capacity only when no instance has room left,
+    the least over-committed first.
+    """
+
+    def __init__(self,
+        instances: Iterable[VirtualInstance],
+        strategy: str = 'best_fit',
+        instance_tiers: Optional[Dict[str, str]] = None
+    ) -> None:
+        if(not strategy in ('best_fit', 'worst_fit')):
+            raise Exception(f'Unknown placement strategy {strategy}')
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError('Automatic placement requires numpy: pip install fogbed[placement]')
+
+        self.np = np
+        self.strategy = strategy
+        self.instances = list(instances)
+        self.tiers = [
+            (instance_tiers or {}).get(instance.label, get_tier(instance)) for instance in self.instances
+        ]
+
+
+    def _capacity(self):
+        np = self.np
+        max_cu = np.full(len(self.instances), np.inf)
+        max_mu = np.full(len(self.instances), np.inf)
+        elastic = np.zeros(len(self.instances), dtype=bool)
+        used_cu = np.zeros(len(self.instances))
+        used_mu = np.zeros(len(self.instances))
+
+        for index, instance in enumerate(self.instances):
+            model = instance.resource_model
+            if(model is None): continue
+            max_cu[index], max_mu[index] = model.max_cu, model.max_mu
+            used_cu[index], used_mu[index] = model.allocated_cu, model.allocated_mu
+            elastic[index] = model.over_provisioning
+        return max_cu, max_mu, max_cu - used_cu, max_mu - used_mu, elastic
+
+
+    def _group(self, containers: List[Container], affinity: Iterable[Iterable[str]]) -> List[List[int]]:
+        # Union-find over container indexes, so overlapping affinity groups merge
+        parent = list(range(len(containers)))
+        position = {container.name: index for index, container in enumerate(containers)}
+
+        def find(index: int) -> int:
+            while(parent[index] != index):
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        for group in affinity:
+            indexes = [position[name] for name in group if(name in position)]
+            for index in indexes[1:]:
+                parent[find(index)] = find(indexes[0])
+
+        units: Dict[int, List[int]] = {}
+        for index in range(len(containers)):
+            units.setdefault(find(index), []).append(index)
+        return list(units.values())
+
+
+    def place(self,
+        containers: Iterable[Container],
+        tiers: Optional[Dict[str, Tier]] = None,
+        affinity: Iterable[Iterable[str]] = (),
+        anti_affinity: Iterable[Iterable[str]] = ()
+    ) -> Dict[str, VirtualInstance]:
+        """Returns the instance chosen for each container name, without
+        allocating anything; raises PlacementFailed when some do not fit."""
+        np = self.np
+        containers = list(containers)
+        tiers = tiers or {}
+        anti_affinity = [set(group) for group in anti_affinity]
+        groups_by_name: Dict[str, List[int]] = {}
+        for index, group in enumerate(anti_affinity):
+            for name in group:
+                groups_by_name.setdefault(name, []).append(index)
+
+        max_cu, max_mu, free_cu, free_mu, elastic = self._capacity()
+        scale_cu = np.where(np.isfinite(max_cu), max_cu, 1.0)
+        scale_mu = np.where(np.isfinite(max_mu), max_mu, 1.0)
+        instance_tiers = np.array([str(tier) for tier in self.tiers])
+
+        demand_cu = np.array([container.compute_units for container in containers], dtype=np.float64)
+        demand_mu = np.array([container.memory_units for container in containers], dtype=np.float64)
+        units = self._group(containers, affinity)
+
+        allowed = [self._allowed(unit, containers, tiers, instance_tiers) for unit in units]
+
+        # Units with fewer candidate instances first, then the largest ones,
+        # measured against the biggest finite instance
+        largest_cu = max_cu[np.isfinite(max_cu)].max(initial=1.0)
+        largest_mu = max_mu[np.isfinite(max_mu)].max(initial=1.0)
+        sizes = [max(demand_cu[unit].sum() / largest_cu, demand_mu[unit].sum() / largest_mu) for unit in units]
+        candidates = [mask.sum() for mask in allowed]
+
+        used_by_group = np.zeros((len(anti_affinity), len(self.instances)), dtype=bool)
+        assignment: Dict[str, VirtualInstance] = {}
+        failed: List[str] = []
+
+        for order in np.lexsort((-np.array(sizes), np.array(candidates))):
+            unit = units[order]
+            names = [containers[index].name for index in unit]
+            unit_cu, unit_mu = demand_cu[unit].sum(), demand_mu[unit].sum()
+            candidate = allowed[order].copy()
+
+            # A unit with two containers of the same anti-affinity group fits nowhere
+            groups = sorted({group for name in names for group in groups_by_name.get(name, [])})
+            if(len(groups) < sum(len(groups_by_name.get(name, [])) for name in names)):
+                candidate[:] = False
+            if(groups):
+                candidate &= ~used_by_group[groups].any(axis=0)
+
+            feasible = candidate & (free_cu >= unit_cu) & (free_mu >= unit_mu)
+            overflow = not feasible.any()
+            if(overflow):
+                feasible = candidate & elastic
+            if(not feasible.any()):
+                failed.extend(names)
+                continue
+
+            # Fraction of each instance left free after placing the item
+            left = np.where(np.isfinite(free_cu), (free_cu - unit_cu) / scale_cu, 1.0) \
+                 + np.where(np.isfinite(free_mu), (free_mu - unit_mu) / scale_mu, 1.0)
+            if(self.strategy == 'best_fit' and not overflow):
+                choice = int(np.argmin(np.where(feasible, left, np.inf)))
+            else:
+                choice = int(np.argmax(np.where(feasible, left, -np.inf)))
+
+            free_cu[choice] -= unit_cu
+            free_mu[choice] -= unit_mu
+            used_by_group[groups, choice] = True
+            for name in names:
+                assignment[name] = self.instances[choice]
+
+        if(failed):
+            raise PlacementFailed(failed)
+        return assignment
+
+
+    def _allowed(self, unit: List[int], containers: List[Container], tiers: Dict[str, Tier], instance_tiers):
+        allowed = self.np.ones(len(self.instances), dtype=bool)
+        for index in unit:
+            tier = tiers.get(containers[index].name)
+            if(tier is not None):
+                allowed &= self.np.isin(instance_tiers, [tier] if(isinstance(tier, str)) else list(tier))
+        return allowed
@@ -1,14 +1,20 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator
 
 from fogbed.node.container import Container
 
 
 class ResourceModel(ABC):
+    # Models that keep admitting containers past max_cu/max_mu, sharing what they have
+    over_provisioning = False
+
     def __init__(self, max_cu: float, max_mu: int) -> None:
         self.max_cu = max_cu
         self.max_mu = max_mu
         self.allocated_cu = 0
         self.allocated_mu = 0
+        self._batch_depth = 0
 
 
     def allocate(self, container: Container):
@@ -35,4 +41,22 @@ class ResourceModel(ABC):
     @abstractmethod
     def free_memory(self, container: Container):
         pass
+
+
+    @contextmanager
+    def batch(self) -> Iterator['ResourceModel']:
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if(self._batch_depth == 0):
+                self.commit()
+
+    def commit(self):
+        pass
+
+    @property
+    def in_batch(self) -> bool:
+        return self._batch_depth > 0
     
\ No newline at end of file
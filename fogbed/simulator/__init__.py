@@ -0,0 +1,192 @@
+import base64
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from fogbed.emulation import Services
+from fogbed.exceptions import ContainerAlreadyExists
+from fogbed.node.container import Container
+from fogbed.node.process import PROCESS_DIR, ManagedProcess
+from fogbed.resources.flavors import HardwareResources, Resources
+
+from mininet.util import ipAdd
+
+RUNTIME_PATH = os.path.join(os.path.dirname(__file__), 'runtime.py')
+SIMULATOR_DIR = f'{PROCESS_DIR}/simulator'
+
+# The fields of the sensors example, generated for every device by default
+DEFAULT_PAYLOAD: Dict[str, Any] = {
+    'name':             '{name}',
+    'temperature':      ['uniform', 35, 39, 1],
+    'heart_rate':       ['randrange', 0, 120],
+    'blood_pressure':   ['randrange', 5, 130],
+    'respiratory_rate': ['randrange', 5, 30],
+}
+
+
+class VirtualDevice:
+    """Identity, rate and payload of a device simulated by a DeviceSimulator.
+
+    A payload maps each field to a constant, a string formatted with the
+    device name and id, or a generator: ['uniform', low, high, digits],
+    ['gauss', mu, sigma, digits], ['randrange', start, stop],
+    ['choice', values], ['counter', start], ['time'] or
+    ['walk', start, step, low, high].
+    """
+
+    def __init__(self,
+        name: str,
+        url: str,
+        interval: float = 1.0,
+        jitter: float = 0.0,
+        payload: Optional[Dict[str, Any]] = None,
+        ip: Optional[str] = None,
+        port: Optional[int] = None,
+        protocol: str = 'http',
+        method: str = 'POST',
+        timeout: float = 5.0,
+        id: int = 0
+    ) -> None:
+        if(not protocol in ('http', 'udp')):
+            raise Exception(f'Unknown device protocol {protocol}')
+        if(interval <= 0):
+            raise Exception(f'{name}: the interval must be positive')
+
+        self.name     = name
+        self.url      = url
+        self.interval = interval
+        self.jitter   = jitter
+        self.payload  = DEFAULT_PAYLOAD if(payload is None) else payload
+        self.ip       = ip
+        self.port     = port
+        self.protocol = protocol
+        self.method   = method
+        self.timeout  = timeout
+        self.id       = id
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name, 'id': self.id, 'url': self.url, 'interval': self.interval,
+            'jitter': self.jitter, 'payload': self.payload, 'ip': self.ip, 'port': self.port,
+            'protocol': self.protocol, 'method': self.method, 'timeout': self.timeout,
+        }
+
+    def __repr__(self) -> str:
+        return f'VirtualDevice(name={self.name}, ip={self.ip}, interval={self.interval})'
+
+
+class DeviceSimulator(Container):
+    """Container hosting many virtual devices in one asyncio process, instead
+    of one container and one process per device.
+
+    Devices can have an address of their own, added as an alias of the
+    container interface: they send from it and, with a port, answer GET
+    requests on it, so servers still see one client per device. Any image
+    with python3 and iproute2 works, like the device image of the sensors
+    example.
+    """
+
+    def __init__(self,
+        name: str,
+        ip: Optional[str] = None,
+        dimage: str = 'esaum/device:latest',
+        resources: HardwareResources = Resources.SMALL,
+        report_interval: float = 5.0,
+        **params: Any
+    ):
+        super().__init__(name, ip=ip, dimage=dimage, resources=resources, **params)
+        self.report_interval = report_interval
+        self.devices: List[VirtualDevice] = []
+
+
+    def add_device(self, name: str, url: str, ip: Optional[str] = None, alias: bool = False, **params: Any) -> VirtualDevice:
+        """Adds a device; with alias=True and no ip, it gets the next address
+        of the emulation, like a container would. Addresses of devices belong
+        to this container, so no other container can take them."""
+        if(ip is None and alias):
+            Container.IP_COUNTER += 1
+            ip = ipAdd(Container.IP_COUNTER)
+
+        if(ip is not None and ip != self.ip):
+            owner = Services.get_container_by_ip(ip)
+            if(owner is not None and owner is not self):
+                raise ContainerAlreadyExists(f'Container with ip={ip} already exists.')
+            if(Services.get_container_by_name(self.name) is self):
+                Services.add_address(ip, self)
+
+        device = VirtualDevice(name, url, ip=ip, id=len(self.devices), **params)
+        self.devices.append(device)
+        return device
+
+    def add_devices(self, count: int, url: str, prefix: Optional[str] = None, **params: Any) -> List[VirtualDevice]:
+        prefix = f'{self.name}-d' if(prefix is None) else prefix
+        return [self.add_device(f'{prefix}{index}', url, **params) for index in range(count)]
+
+
+    @property
+    def addresses(self) -> List[str]:
+        return [self.ip] + [device.ip for device in self.devices if(device.ip is not None and device.ip != self.ip)]
+
+
+    def _upload(self, path: str, data: bytes):
+        # A single command through the shell, so it also works on remote workers; the
+        # terminal truncates lines over 4095 bytes, which base64 keeps at 76
+        encoded = base64.encodebytes(data).decode()
+        self.cmd(f"mkdir -p {SIMULATOR_DIR}; base64 -d > {path} << 'FOGBED_EOF'\n{encoded}FOGBED_EOF")
+
+    def _add_aliases(self):
+        aliases = self.addresses[1:]
+        if(not aliases): return
+
+        # Aliases share the prefix of the address the interface already has
+        interface = f'{self.name}-eth0'
+        output = self.cmd(f'ip -o -4 address show dev {interface}')
+        match = re.search(r'inet [\d.]+/(\d+)', output)
+        if(match is None):
+            raise Exception(f'{self.name}: could not read the address of {interface}: {output.strip()}')
+
+        # One ip process adds every alias; -force keeps going past existing ones
+        batch = ''.join(f'address add {ip}/{match.group(1)} dev {interface}\n' for ip in aliases)
+        self._upload(f'{SIMULATOR_DIR}/aliases', batch.encode())
+        self.cmd(f'ip -force -batch {SIMULATOR_DIR}/aliases')
+
+
+    def start_devices(self) -> ManagedProcess:
+        """Copies the runtime and the devices into the container and starts
+        them as the background process 'devices'."""
+        with open(RUNTIME_PATH, 'rb') as file:
+            self._upload(f'{SIMULATOR_DIR}/runtime.py', file.read())
+
+        config = {
+            'report_interval': self.report_interval,
+            'devices': [device.to_dict() for device in self.devices],
+        }
+        self._upload(f'{SIMULATOR_DIR}/devices.json', json.dumps(config).encode())
+        self._add_aliases()
+
+        command = f'python3 {SIMULATOR_DIR}/runtime.py {SIMULATOR_DIR}/devices.json'
+        if('devices' in self.processes):
+            self.processes['devices'].command = command
+            return self.processes['devices'].restart()
+        return self.start_process('devices', command)
+
+    def stop_devices(self):
+        if('devices' in self.processes):
+            self.processes['devices'].stop()
+
+
+    def device_stats(self) -> Dict[str, Any]:
+        """Last counters reported by the runtime: devices, connected, sent,
+        errors, latency_ms, max_lag_ms and requests."""
+        if(not 'devices' in self.processes):
+            return {}
+        for line in reversed(self.processes['devices'].stdout(tail=5).splitlines()):
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+        return {}
+
+    def __repr__(self) -> str:
+        return f'DeviceSimulator(name={self.name}, devices={len(self.devices)})'
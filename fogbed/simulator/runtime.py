@@ -0,0 +1,242 @@
+"""Runs the virtual devices of a DeviceSimulator inside its container.
+
+This file is copied into the container and executed there, so it only uses
+the standard library:
+
+    python3 runtime.py devices.json
+
+Every device is a coroutine of the same asyncio event loop that sends its
+payload every interval, over a keep-alive HTTP connection or UDP, from its own
+source address; a request slower than the device timeout counts as an error.
+A device with a port also answers GET requests on its address with the last
+payload it sent. One JSON line of counters is printed every
+report_interval seconds.
+"""
+import asyncio
+import json
+import random
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+Generator = Callable[[], Any]
+
+
+def get_generator(spec: Any, device: Dict[str, Any]) -> Generator:
+    """Builds the generator of a payload field: a constant, a string formatted
+    with the device name and id, or a list [kind, *args]."""
+    if(isinstance(spec, str)):
+        value = spec.format(**device)
+        return lambda: value
+    if(not isinstance(spec, list) or not spec or not isinstance(spec[0], str)):
+        return lambda: spec
+
+    kind, args = spec[0], spec[1:]
+    if(kind == 'uniform'):
+        low, high, digits = (args + [None])[:3]
+        return lambda: round(random.uniform(low, high), digits) if(digits is not None) else random.uniform(low, high)
+    if(kind == 'gauss'):
+        mu, sigma, digits = (args + [None])[:3]
+        return lambda: round(random.gauss(mu, sigma), digits) if(digits is not None) else random.gauss(mu, sigma)
+    if(kind == 'randrange'):
+        return lambda: random.randrange(*args)
+    if(kind == 'choice'):
+        return lambda: random.choice(args[0])
+    if(kind == 'time'):
+        return time.time
+    if(kind == 'counter'):
+        counter = iter(range(int(args[0]) if(args) else 0, sys.maxsize))
+        return lambda: next(counter)
+    if(kind == 'walk'):
+        # Random walk between low and high, like a slowly changing reading
+        state = {'value': args[0]}
+        step, low, high = args[1], args[2], args[3]
+        def walk() -> float:
+            state['value'] = min(max(state['value'] + random.uniform(-step, step), low), high)
+            return round(state['value'], 2)
+        return walk
+    raise ValueError(f'Unknown payload generator {kind}')
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.sent = 0
+        self.errors = 0
+        self.latency = 0.0
+        self.window = 0
+        self.max_lag = 0.0
+        self.requests = 0
+
+    def report(self, devices: int, connected: int) -> str:
+        line = json.dumps({
+            'time':       round(time.time(), 3),
+            'devices':    devices,
+            'connected':  connected,
+            'sent':       self.sent,
+            'errors':     self.errors,
+            'latency_ms': round(self.latency / self.window * 1e3, 3) if(self.window) else 0.0,
+            'max_lag_ms': round(self.max_lag * 1e3, 3),
+            'requests':   self.requests,
+        })
+        # Latency and lag are measured over each report interval
+        self.latency, self.window, self.max_lag = 0.0, 0, 0.0
+        return line
+
+
+class Device:
+    def __init__(self, config: Dict[str, Any], stats: Stats) -> None:
+        self.name     = config['name']
+        self.id       = config.get('id', 0)
+        self.url      = urlsplit(config['url'])
+        self.protocol = config.get('protocol', 'http')
+        self.method   = config.get('method', 'POST')
+        self.interval = float(config.get('interval', 1.0))
+        self.jitter   = float(config.get('jitter', 0.0))
+        self.timeout  = float(config.get('timeout', 5.0))
+        self.ip: Optional[str] = config.get('ip')
+        self.port: Optional[int] = config.get('port')
+        self.stats    = stats
+        self.fields   = {
+            key: get_generator(spec, {'name': self.name, 'id': self.id})
+            for key, spec in config.get('payload', {}).items()
+        }
+        self.last = b'{}'
+        self.connection: Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = None
+        self.transport: Optional[asyncio.DatagramTransport] = None
+
+
+    def generate(self) -> bytes:
+        self.last = json.dumps({key: field() for key, field in self.fields.items()}).encode()
+        return self.last
+
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        # Devices start spread over one interval, then keep an absolute schedule
+        deadline = loop.time() + random.uniform(0, self.interval)
+
+        while True:
+            delay = deadline - loop.time()
+            if(delay > 0):
+                await asyncio.sleep(delay)
+            else:
+                self.stats.max_lag = max(self.stats.max_lag, -delay)
+
+            started = loop.time()
+            try:
+                if(self.protocol == 'udp'): await self.send_udp()
+                else: await asyncio.wait_for(self.send_http(), self.timeout)
+                self.stats.sent += 1
+                self.stats.window += 1
+                self.stats.latency += loop.time() - started
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                self.stats.errors += 1
+                self.close()
+
+            deadline += self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+            if(deadline < loop.time()): deadline = loop.time()
+
+
+    async def send_http(self):
+        body = self.generate()
+        if(self.connection is None):
+            local_addr = (self.ip, 0) if(self.ip) else None
+            self.connection = await asyncio.open_connection(
+                self.url.hostname, self.url.port or 80, local_addr=local_addr)
+
+        reader, writer = self.connection
+        path = self.url.path or '/'
+        writer.write(
+            f'{self.method} {path} HTTP/1.1\r\nHost: {self.url.netloc}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body)
+
+        status = await reader.readline()
+        length, keep_alive = 0, True
+        while True:
+            line = await reader.readline()
+            if(line in (b'\r\n', b'\n', b'')): break
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+            if(name == b'content-length'):
+                length = int(value)
+            elif(name == b'connection' and value.strip().lower() == b'close'):
+                keep_alive = False
+        if(length): await reader.readexactly(length)
+        if(not keep_alive): self.close()
+
+        if(not status.startswith(b'HTTP/1.') or status[9:10] not in (b'2', b'3')):
+            raise ValueError(status.decode(errors='replace').strip())
+
+
+    async def send_udp(self):
+        if(self.transport is None):
+            local_addr = (self.ip, 0) if(self.ip) else None
+            self.transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                asyncio.DatagramProtocol, remote_addr=(self.url.hostname, self.url.port), local_addr=local_addr)
+        self.transport.sendto(self.generate())
+
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Answers every request on the device's address with its last payload
+        try:
+            while await reader.readline() not in (b'\r\n', b'\n', b''): pass
+            self.stats.requests += 1
+            writer.write(
+                f'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(self.last)}\r\nConnection: close\r\n\r\n'.encode() + self.last)
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+    async def listen(self) -> Optional[asyncio.AbstractServer]:
+        if(self.port is None): return None
+        return await asyncio.start_server(self.handle, self.ip or '0.0.0.0', self.port)
+
+
+    def close(self):
+        if(self.connection is not None):
+            self.connection[1].close()
+            self.connection = None
+        if(self.transport is not None):
+            self.transport.close()
+            self.transport = None
+
+
+def raise_file_limit():
+    # Every device may hold a connection and a listening socket
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if(soft != hard):
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def main(config: Dict[str, Any]):
+    stats = Stats()
+    devices = [Device(device, stats) for device in config['devices']]
+    servers: List[asyncio.AbstractServer] = []
+    for device in devices:
+        server = await device.listen()
+        if(server is not None): servers.append(server)
+
+    tasks = [asyncio.ensure_future(device.run()) for device in devices]
+    try:
+        while True:
+            await asyncio.sleep(float(config.get('report_interval', 5.0)))
+            connected = sum(1 for device in devices if(device.connection or device.transport))
+            print(stats.report(len(devices), connected), flush=True)
+    finally:
+        for task in tasks: task.cancel()
+        for server in servers: server.close()
+        for device in devices: device.close()
+
+
+if(__name__=='__main__'):
+    raise_file_limit()
+    with open(sys.argv[1]) as file:
+        config = json.load(file)
+    try:
+        asyncio.run(main(config))
+    except KeyboardInterrupt:
+        pass
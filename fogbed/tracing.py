@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, float('inf')]
+
+DISABLED_SPAN = nullcontext()
+
+
+class Tracer:
+    """Records the duration of lifecycle phases and DockerService calls.
+
+    Disabled by default; once enabled, every span becomes a complete event of
+    the Chrome trace format and its latency is kept for the summary.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.events: List[Dict[str, Any]] = []
+        self.latencies: Dict[str, List[float]] = {}
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+            self.latencies = {}
+            self._threads = {}
+        self._origin = time.perf_counter()
+
+
+    def span(self, name: str, category: str = 'phase', **args: Any):
+        if(not self.enabled):
+            return DISABLED_SPAN
+        return self._span(name, category, args)
+
+    @contextmanager
+    def _span(self, name: str, category: str, args: Dict[str, Any]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, category, start, time.perf_counter() - start, args)
+
+
+    def record(self, name: str, category: str, start: float, duration: float, args: Optional[Dict[str, Any]] = None):
+        thread = threading.current_thread()
+        event = {
+            'name': name,
+            'cat':  category,
+            'ph':   'X',
+            'ts':   (start - self._origin) * 1e6,
+            'dur':  duration * 1e6,
+            'pid':  os.getpid(),
+            'tid':  thread.ident,
+            'args': args or {},
+        }
+        with self._lock:
+            self.events.append(event)
+            self.latencies.setdefault(f'{category}.{name}', []).append(duration)
+            self._threads.setdefault(thread.ident or 0, thread.name)
+
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Call count, latency percentiles in milliseconds and histogram of each span name."""
+        with self._lock:
+            latencies = {name: sorted(values) for name, values in self.latencies.items()}
+
+        result: Dict[str, Dict[str, Any]] = {}
+        for name, values in latencies.items():
+            histogram = {f'<={bound}ms': 0 for bound in HISTOGRAM_BUCKETS}
+            for value in values:
+                bound = next(bound for bound in HISTOGRAM_BUCKETS if(value * 1e3 <= bound))
+                histogram[f'<={bound}ms'] += 1
+
+            result[name] = {
+                'count':     len(values),
+                'total_s':   sum(values),
+                'mean_ms':   sum(values) / len(values) * 1e3,
+                'p50_ms':    values[int(0.50 * (len(values) - 1))] * 1e3,
+                'p95_ms':    values[int(0.95 * (len(values) - 1))] * 1e3,
+                'max_ms':    values[-1] * 1e3,
+                'histogram': histogram,
+            }
+        return result
+
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+            for tid, name in threads.items()
+        ]
+        return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path: str):
+        """Writes a JSON file that chrome://tracing and Perfetto can open."""
+        with open(path, 'w') as file:
+            json.dump(self.to_chrome_trace(), file)
+
+
+tracer = Tracer()
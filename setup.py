@@ -19,6 +19,11 @@ setup(
     install_requires = [
         'clusternet @ https://github.com/EsauM10/clusternet/tarball/main#egg=clusternet'
     ],
+    extras_require = {
+        'monitoring': ['numpy'],
+        'placement': ['numpy'],
+        'parquet': ['numpy', 'pyarrow']
+    },
     packages=find_packages(),
     include_package_data=True,
     zip_safe=False